@@ -0,0 +1,167 @@
+"""bilibili 爬取 / 搜索 / 下载流程的离线压测
+
+通过 src.bili_api.fixture_server 回放录制好的响应，分别多次执行
+create_video_list_file、search_on_bilibili 与 download_music，输出耗时与吞吐量。
+每次执行前清空相关缓存，测量的是完整的网络路径。被测函数报告结果不完整（如某个 UP 主同步失败、
+某页搜索结果缺失、下载的文件不存在）时同样计为失败。
+
+先用 --record 对真实 bilibili 录制一次（需要网络），之后即可离线回放：
+
+    python benchmarks/bench_bili.py fixtures/ --record
+    python benchmarks/bench_bili.py fixtures/ --runs 10 --latency 0.05 --jitter 0.05
+    python benchmarks/bench_bili.py fixtures/ --rate-limit 5 --error-ratio 0.05 --bandwidth 2000000
+
+程序在临时目录中运行（数据、缓存与下载文件都写到那里），不会影响本机的数据目录。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class Result:
+    name: str
+    durations: list[float] = field(default_factory=list)
+    failures: int = 0
+    bytes_sent: int = 0
+
+    def report(self) -> str:
+        if not self.durations:
+            return f"{self.name:<24} 全部 {self.failures} 次失败"
+        total = sum(self.durations)
+        ordered = sorted(self.durations)
+        p95 = ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))]
+        line = (
+            f"{self.name:<24} 成功 {len(self.durations):>3}  失败 {self.failures:>3}  "
+            f"平均 {statistics.mean(self.durations) * 1000:8.1f} ms  "
+            f"p50 {statistics.median(self.durations) * 1000:8.1f} ms  "
+            f"p95 {p95 * 1000:8.1f} ms  "
+            f"吞吐 {len(self.durations) / total:6.2f} 次/秒"
+        )
+        if self.bytes_sent:
+            line += f"  {self.bytes_sent / total / 1024 / 1024:6.2f} MiB/s"
+        return line
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", type=Path, help="录制结果目录")
+    parser.add_argument("--record", action="store_true", help="转发到真实 bilibili 并录制（每项只执行一次）")
+    parser.add_argument("--runs", type=int, default=5, help="每项执行的次数")
+    parser.add_argument("--up", type=int, action="append", help="爬取的 UP 主 uid（可重复），默认使用配置中的列表")
+    parser.add_argument("--keyword", default="歌回", help="搜索关键词")
+    parser.add_argument("--bv", help="下载测试使用的 BV 号，不指定时跳过下载测试")
+    parser.add_argument("--only", choices=["crawl", "search", "download"], action="append", help="只执行指定项")
+    parser.add_argument("--unthrottled", action="store_true", help="取消请求调度器的限速，只测量客户端开销")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--error-ratio", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    fixtures = args.fixtures.resolve()
+
+    # src.config 以当前目录作为数据目录，先切换到临时目录再导入
+    os.chdir(tempfile.mkdtemp(prefix="neuro-bench-"))
+    sys.path.insert(0, str(ROOT))
+
+    from src.bili_api.fixture_server import FaultProfile, FixtureServer, install
+    from src.bili_api.music import download_music
+    from src.bili_api.scheduler import EndpointPolicy, get_scheduler
+    from src.bili_api.search import search_on_bilibili
+    from src.bili_api.video_info import get_video_info_cache
+    from src.bili_api.videos import create_video_list_file
+    from src.config import MUSIC_DIR, cfg
+    from src.utils.cache import get_persistent_cache
+    from src.utils.runtime import AsyncRuntime, run_sync
+
+    faults = FaultProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        error_ratio=args.error_ratio,
+        bandwidth=args.bandwidth,
+    )
+    server = FixtureServer(fixtures, "record" if args.record else "replay", faults)
+    # 服务器运行在独立的事件循环中，不与被测代码争用共享运行时
+    server_runtime = AsyncRuntime("fixture-server")
+    install(server_runtime.run(server.start()))
+
+    if args.unthrottled:
+        get_scheduler().policies = {name: EndpointPolicy(rate=1e6, burst=10**6) for name in get_scheduler().policies}
+    if args.up:
+        cfg.up_list.value = args.up
+    MUSIC_DIR.mkdir(parents=True, exist_ok=True)
+
+    def download() -> bool:
+        get_video_info_cache().clear()
+        output = MUSIC_DIR / f"{args.bv}.{cfg.download_type.value}"
+        output.unlink(missing_ok=True)
+        run_sync(download_music(args.bv, output))
+        return output.exists() and output.stat().st_size > 0
+
+    def search() -> bool:
+        get_persistent_cache("search_pages", cfg.search_cache_ttl.value).clear()
+        return run_sync(search_on_bilibili(args.keyword))
+
+    scenarios: dict[str, Callable[[], bool]] = {
+        "crawl": lambda: create_video_list_file(force_refresh=True, backfill=True),
+        "search": search,
+        "download": download,
+    }
+    runs = 1 if args.record else args.runs
+
+    results = []
+    try:
+        for name, scenario in scenarios.items():
+            if (args.only and name not in args.only) or (name == "download" and not args.bv):
+                continue
+            result = Result(name)
+            for _ in range(runs):
+                sent = server.stats.bytes_sent
+                start = time.perf_counter()
+                try:
+                    ok = scenario()
+                except Exception as e:
+                    result.failures += 1
+                    print(f"{name} 执行失败: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                if not ok:
+                    # 爬取与搜索在内部隔离了错误，只通过返回值报告结果不完整
+                    result.failures += 1
+                    print(f"{name} 结果不完整", file=sys.stderr)
+                    continue
+                result.durations.append(time.perf_counter() - start)
+                result.bytes_sent += server.stats.bytes_sent - sent
+            results.append(result)
+    finally:
+        server_runtime.run(server.close())
+        server_runtime.shutdown()
+
+    print()
+    for result in results:
+        print(result.report())
+    stats = server.stats
+    print(
+        f"\n服务器: 响应 {stats.served}  录制 {stats.recorded}  缺失 {stats.missing}  "
+        f"限流 {stats.throttled}  错误 {stats.errors}  发送 {stats.bytes_sent / 1024 / 1024:.1f} MiB"
+    )
+    for url in stats.missing_urls[:10]:
+        print(f"  缺失: {url}")
+
+
+if __name__ == "__main__":
+    main()
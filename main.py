@@ -50,6 +50,12 @@ if __name__ == "__main__":
 
     setup_logger()
 
+    # 调试 / 压测时把 bilibili 请求转发到本地的录制回放服务器
+    if fixture_url := os.environ.get("NEURO_BILI_FIXTURE"):
+        from src.bili_api.fixture_server import install
+
+        install(fixture_url)
+
     # 语言资源目录迁移到 data/i18n，若为空则从 assets 引导复制
     language_file_dir = I18N_DIR
     try:
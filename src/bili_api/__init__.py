@@ -1,7 +1,10 @@
+from .music import download_song as download_song
 from .music import run_music_download as run_music_download
 from .music import search_song_list as search_song_list
+from .music import get_video_parts as get_video_parts
 from .music import get_video_parts_sync as get_video_parts_sync
 from .search import search_on_bilibili as search_on_bilibili
 from .videos import create_video_list_file as create_video_list_file
 from .videos import get_up_name as get_up_name
 from .videos import get_up_names as get_up_names
+from .videos import get_cached_up_names as get_cached_up_names
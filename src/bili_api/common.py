@@ -1,7 +1,12 @@
+from urllib.parse import urlsplit
+
 from bilibili_api import Credential
 
 from src.config import cfg
 
+# 非空时，所有发往 bilibili（包括媒体 CDN）的请求都改为发往该地址（见 fixture_server）
+_redirect_base: str | None = None
+
 
 def get_credential() -> Credential:
     return Credential(
@@ -9,3 +14,20 @@ def get_credential() -> Credential:
         bili_jct=cfg.bili_jct.value,
         buvid3=cfg.bili_buvid3.value,
     )
+
+
+def set_redirect_base(base_url: str | None) -> None:
+    """设置请求转发地址，None 表示直接访问 bilibili"""
+    global _redirect_base
+    _redirect_base = base_url.rstrip("/") if base_url else None
+
+
+def rewrite_url(url: str) -> str:
+    """按转发设置改写请求地址：https://host/path?query → {base}/host/path?query"""
+    if _redirect_base is None:
+        return url
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or url.startswith(_redirect_base):
+        return url
+    rewritten = f"{_redirect_base}/{parts.netloc}{parts.path or '/'}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
@@ -0,0 +1,467 @@
+"""可断点续传的媒体下载
+
+下载中的数据写入 CACHE_DIR/downloads 下以内容命名的 .part 文件（由媒体地址的路径决定，
+与每次都会变化的签名参数无关）。网络中断、程序崩溃或重启后再次下载同一条流时，
+用 Range 请求从已有长度继续；下载完成后校验长度，与服务器给出的总长度一致才交给 ffmpeg。
+
+服务器支持 Range 且文件较大时改为分段下载：预先分配好整个文件，把未下载的字节范围分给
+多条连接并行写入各自的位置，进度记录在 .part.json 中（总是先于预分配写入，长度完整却没有
+进度文件的 .part 视为不可信，重新下载）。先完成的连接会拆走剩余最多的一段的后半部分，
+慢连接拖住的范围因此会被重新分配。
+
+同一条流在本进程内同时只会有一个下载：resumable_download 按缓存文件加锁，持有到调用方用完并删除
+文件为止，并发请求同一条流的调用方依次进行，不会同时写入同一个 .part 文件。
+
+stream_chunks 不写入磁盘，直接逐块产出数据（用于边下载边转码），中断时同样用 Range 续传。
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import random
+import re
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger
+
+from src.config import CACHE_DIR, cfg
+from src.utils.runtime import get_http_session
+
+from .common import rewrite_url
+
+DOWNLOAD_DIR = CACHE_DIR / "downloads"
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".json"
+
+# 单次读取的块大小（字节）、中断后续传的最大次数与退避上限（秒）
+CHUNK_SIZE = 64 * 1024
+MAX_RESUMES = 5
+RESUME_BACKOFF_CAP = 10.0
+# 小于两倍该大小的文件不分段；剩余不足两倍该大小的段不再拆分（字节）
+SEGMENT_MIN_SIZE = 1024 * 1024
+# 分段下载进度的保存间隔（秒）
+STATE_SAVE_INTERVAL = 1.0
+# 超过该时长未再续传的 .part 文件视为放弃，清理掉（秒）
+PART_MAX_AGE = 7 * 24 * 3600
+# 下载进度写入日志的最小间隔（秒）
+PROGRESS_LOG_INTERVAL = 1.0
+
+_CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+
+class IncompleteDownloadError(Exception):
+    """下载结束时数据长度与服务器给出的总长度不一致"""
+
+    def __init__(self, received: int, expected: int) -> None:
+        super().__init__(f"下载不完整: {received}/{expected} 字节")
+        self.received = received
+        self.expected = expected
+
+
+def content_path(url: str, ext: str) -> Path:
+    """媒体流对应的缓存文件路径（同一条流在不同 CDN 节点、不同签名下路径相同）"""
+    key = hashlib.sha1(urlsplit(url).path.encode()).hexdigest()[:20]
+    return DOWNLOAD_DIR / f"{key}{ext}"
+
+
+def _total_from_headers(resp: aiohttp.ClientResponse, offset: int) -> int | None:
+    if resp.status == 206 and (match := _CONTENT_RANGE.fullmatch(resp.headers.get("Content-Range", ""))):
+        return int(match[3]) if match[3] != "*" else None
+    if resp.content_length is not None:
+        return offset + resp.content_length
+    return None
+
+
+def prune_partials(max_age: float = PART_MAX_AGE) -> None:
+    """删除长时间未续传的 .part 文件"""
+    deadline = time.time() - max_age
+    for fp in DOWNLOAD_DIR.glob(f"*{PART_SUFFIX}*"):
+        try:
+            if fp.stat().st_mtime < deadline:
+                fp.unlink()
+                logger.debug(f"已清理过期的未完成下载: {fp.name}")
+        except OSError:
+            pass
+
+
+class DownloadProgress:
+    """按 PROGRESS_LOG_INTERVAL 节流的下载进度，写入日志而不是 stdout（--json 模式下 stdout 只输出结果）"""
+
+    def __init__(self, intro: str) -> None:
+        self.intro = intro
+        self._logged_at = 0.0
+
+    def update(self, current: int, total: int | None) -> None:
+        now = time.monotonic()
+        if current != total and now - self._logged_at < PROGRESS_LOG_INTERVAL:
+            return
+        self._logged_at = now
+        logger.debug(f"{self.intro} [{current} / {total}]")
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+async def _transfer(url: str, part: Path, headers: dict[str, str], intro: str) -> int:
+    """从 part 的当前长度继续下载一次，返回服务器给出的总长度（未知时返回已下载长度）"""
+    offset = await asyncio.to_thread(_file_size, part)
+    request_headers = {**headers, "Range": f"bytes={offset}-"} if offset else headers
+    session = await get_http_session()
+    async with session.get(rewrite_url(url), headers=request_headers) as resp:
+        if resp.status == 416:
+            # 已有数据不短于服务器上的文件：长度恰好一致说明上次已经下载完成
+            match = _CONTENT_RANGE.fullmatch(resp.headers.get("Content-Range", ""))
+            if match and match[3] != "*" and int(match[3]) == offset:
+                return offset
+            logger.warning(f"缓存的未完成下载与服务器不一致，重新下载: {part.name}")
+            await asyncio.to_thread(part.unlink, missing_ok=True)
+            return await _transfer(url, part, headers, intro)
+        resp.raise_for_status()
+        if offset and resp.status != 206:
+            logger.info("服务器不支持断点续传，重新下载")
+            offset = 0
+        total = _total_from_headers(resp, offset)
+        if offset:
+            logger.info(f"断点续传: 从 {offset} 字节继续（共 {total} 字节）")
+
+        current = offset
+        progress = DownloadProgress(intro)
+        # 打开文件放到线程中；单块写入只进入页缓存，直接在事件循环中进行
+        fp = await asyncio.to_thread(part.open, "ab" if offset else "wb")
+        with fp:
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                current += fp.write(chunk)
+                progress.update(current, total)
+
+    if total is not None and current != total:
+        raise IncompleteDownloadError(current, total)
+    return total if total is not None else current
+
+
+async def _probe_length(url: str, headers: dict[str, str]) -> int | None:
+    """请求第一个字节，服务器支持 Range 时返回文件总长度"""
+    session = await get_http_session()
+    try:
+        async with session.get(rewrite_url(url), headers={**headers, "Range": "bytes=0-0"}) as resp:
+            match = _CONTENT_RANGE.fullmatch(resp.headers.get("Content-Range", ""))
+            if resp.status == 206 and match and match[3] != "*":
+                return int(match[3])
+    except (aiohttp.ClientError, TimeoutError, ConnectionError) as e:
+        logger.debug(f"探测文件长度失败，改为顺序下载: {type(e).__name__}: {e}")
+    return None
+
+
+@dataclass(eq=False)
+class Segment:
+    """尚未下载的字节范围 [pos, end)，end 可能因被其它连接拆分而缩小"""
+
+    pos: int
+    end: int
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.pos
+
+
+class SegmentedDownload:
+    """多连接分段下载，各段直接写入预分配文件中的对应位置"""
+
+    def __init__(self, url: str, part: Path, headers: dict[str, str], total: int, connections: int, intro: str):
+        self.url = url
+        self.part = part
+        self.state_path = part.with_name(part.name + STATE_SUFFIX)
+        self.headers = headers
+        self.total = total
+        self.connections = connections
+        self.progress = DownloadProgress(intro)
+        self.pending: list[Segment] = []
+        self.active: list[Segment] = []
+        self.received = 0
+        self.failures = 0
+        self._saved_at = 0.0
+
+    def _load_state(self) -> list[Segment] | None:
+        try:
+            state = json.loads(self.state_path.read_text("utf-8"))
+            if state["total"] == self.total:
+                return [Segment(pos, end) for pos, end in state["pending"] if pos < end]
+        except (ValueError, KeyError, TypeError):
+            logger.opt(exception=True).warning(f"分段下载进度文件损坏: {self.state_path.name}")
+        return None
+
+    def _restore(self) -> None:
+        """从进度文件或顺序下载留下的 .part 恢复未完成的范围
+
+        预分配文件长度之前总会先写好进度文件，所以只有「进度文件有效且文件长度完整」时才按进度续传；
+        长度完整却没有进度文件的 .part 无法判断哪些范围已经写入，重新下载。
+        """
+        size = _file_size(self.part)
+        if self.state_path.exists():
+            if size == self.total and (pending := self._load_state()) is not None:
+                self.pending = pending
+                logger.info(f"从进度文件恢复分段下载: 剩余 {len(self.pending)} 段")
+                return
+            logger.warning(f"分段下载进度与缓存文件不一致，重新下载: {self.part.name}")
+            size = 0
+        elif size >= self.total:
+            if size:
+                logger.warning(f"缓存文件没有分段下载进度，无法确认内容，重新下载: {self.part.name}")
+            size = 0
+
+        # 顺序下载留下的前缀是连续写入的，可以保留；先落盘进度再扩展文件长度
+        self.pending = [Segment(size, self.total)]
+        self._save_state(force=True)
+        with open(self.part, "r+b" if size else "wb") as fp:
+            fp.truncate(self.total)
+
+    def _split(self, seg: Segment) -> Segment | None:
+        """把 seg 剩余部分的后半拆成新的段"""
+        if seg.remaining < 2 * SEGMENT_MIN_SIZE:
+            return None
+        mid = seg.pos + seg.remaining // 2
+        new = Segment(mid, seg.end)
+        seg.end = mid
+        return new
+
+    def _plan(self) -> None:
+        """按剩余大小决定连接数，把未完成的范围拆到足够的段数"""
+        remaining = sum(seg.remaining for seg in self.pending)
+        self.connections = max(1, min(self.connections, remaining // SEGMENT_MIN_SIZE))
+        while self.pending and len(self.pending) < self.connections:
+            largest = max(self.pending, key=lambda seg: seg.remaining)
+            if (new := self._split(largest)) is None:
+                break
+            self.pending.append(new)
+
+    def _next_segment(self) -> Segment | None:
+        if self.pending:
+            return self.pending.pop(0)
+        # 没有待下载的范围时，拆走进行中剩余最多的一段的后半部分
+        if self.active:
+            return self._split(max(self.active, key=lambda seg: seg.remaining))
+        return None
+
+    def _save_state(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._saved_at < STATE_SAVE_INTERVAL:
+            return
+        self._saved_at = now
+        ranges = [[seg.pos, seg.end] for seg in (*self.pending, *self.active) if seg.remaining > 0]
+        # 先写临时文件再替换，中途崩溃不会留下写了一半的进度文件
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps({"total": self.total, "pending": ranges}), "utf-8")
+        tmp.replace(self.state_path)
+
+    async def _fetch(self, seg: Segment, fp) -> None:
+        session = await get_http_session()
+        headers = {**self.headers, "Range": f"bytes={seg.pos}-{seg.end - 1}"}
+        async with session.get(rewrite_url(self.url), headers=headers) as resp:
+            resp.raise_for_status()
+            match = _CONTENT_RANGE.fullmatch(resp.headers.get("Content-Range", ""))
+            if resp.status != 206 or not match or match[1] is None or int(match[1]) != seg.pos:
+                raise aiohttp.ClientPayloadError(f"服务器没有按 Range 返回数据: {resp.status}")
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                # 段可能已被其它连接拆走一部分，只写到当前的结束位置
+                chunk = chunk[: seg.remaining]
+                fp.seek(seg.pos)
+                fp.write(chunk)
+                seg.pos += len(chunk)
+                self.received += len(chunk)
+                self.progress.update(self.received, self.total)
+                if seg.remaining <= 0:
+                    break
+                fp.flush()
+                self._save_state()
+        if seg.remaining > 0:
+            raise IncompleteDownloadError(seg.pos, seg.end)
+
+    async def _worker(self) -> None:
+        fp = await asyncio.to_thread(self.part.open, "r+b")
+        with fp:
+            while (seg := self._next_segment()) is not None:
+                self.active.append(seg)
+                try:
+                    await self._fetch(seg, fp)
+                except (aiohttp.ClientError, TimeoutError, ConnectionError, IncompleteDownloadError) as e:
+                    if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429:
+                        raise
+                    self.failures += 1
+                    if self.failures > MAX_RESUMES * self.connections:
+                        raise
+                    delay = random.uniform(0, min(RESUME_BACKOFF_CAP, 0.5 * 2 ** min(self.failures, 10)))
+                    logger.warning(
+                        f"分段 {seg.pos}-{seg.end} 下载中断（{type(e).__name__}: {e}），{delay:.1f} 秒后重试"
+                    )
+                    await asyncio.sleep(delay)
+                finally:
+                    fp.flush()
+                    self.active.remove(seg)
+                    if seg.remaining > 0:
+                        self.pending.append(seg)
+
+    async def run(self) -> None:
+        await asyncio.to_thread(self._restore)
+        self.received = self.total - sum(seg.remaining for seg in self.pending)
+        self._plan()
+        logger.info(f"分段下载: {self.total} 字节，{self.connections} 条连接，剩余 {self.total - self.received} 字节")
+        try:
+            async with asyncio.TaskGroup() as group:
+                for _ in range(self.connections):
+                    group.create_task(self._worker())
+        except BaseException as e:
+            self._save_state(force=True)
+            # 只有一条连接出错时抛出原始异常，便于调用方按类型处理
+            if isinstance(e, BaseExceptionGroup) and len(e.exceptions) == 1:
+                raise e.exceptions[0] from None
+            raise
+        self.state_path.unlink(missing_ok=True)
+
+
+async def _fetch_sequential(url: str, part: Path, headers: dict[str, str], intro: str) -> int:
+    attempt = 0
+    while True:
+        try:
+            return await _transfer(url, part, headers, intro)
+        except (aiohttp.ClientError, TimeoutError, ConnectionError, IncompleteDownloadError) as e:
+            if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429:
+                raise
+            if attempt >= MAX_RESUMES:
+                raise
+            attempt += 1
+            delay = random.uniform(0, min(RESUME_BACKOFF_CAP, 0.5 * 2**attempt))
+            logger.warning(f"下载中断（{type(e).__name__}: {e}），{delay:.1f} 秒后第 {attempt} 次续传")
+            await asyncio.sleep(delay)
+
+
+async def stream_chunks(url: str, headers: dict[str, str], intro: str = "下载") -> AsyncIterator[bytes]:
+    """边下载边逐块产出数据，不写入磁盘
+
+    连接中断时用 Range 从已产出的位置继续；服务器不支持续传时无法补回已经交出的数据，直接报错。
+    """
+    offset = 0
+    total: int | None = None
+    attempt = 0
+    progress = DownloadProgress(intro)
+    session = await get_http_session()
+    while True:
+        request_headers = {**headers, "Range": f"bytes={offset}-"} if offset else headers
+        try:
+            async with session.get(rewrite_url(url), headers=request_headers) as resp:
+                resp.raise_for_status()
+                if offset and resp.status != 206:
+                    raise RuntimeError(f"服务器不支持断点续传，无法继续流式下载（已接收 {offset} 字节）")
+                if total is None:
+                    total = _total_from_headers(resp, offset)
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    offset += len(chunk)
+                    progress.update(offset, total)
+                    yield chunk
+            if total is not None and offset != total:
+                raise IncompleteDownloadError(offset, total)
+            return
+        except (aiohttp.ClientError, TimeoutError, ConnectionError, IncompleteDownloadError) as e:
+            if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and e.status != 429:
+                raise
+            if attempt >= MAX_RESUMES:
+                raise
+            attempt += 1
+            delay = random.uniform(0, min(RESUME_BACKOFF_CAP, 0.5 * 2**attempt))
+            logger.warning(f"流式下载中断（{type(e).__name__}: {e}），{delay:.1f} 秒后从 {offset} 字节续传")
+            await asyncio.sleep(delay)
+
+
+def _prepare(target: Path) -> int | None:
+    """创建下载目录并清理过期文件，返回已下载完成的文件长度（不存在时为 None）"""
+    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    prune_partials()
+    return target.stat().st_size if target.exists() else None
+
+
+async def fetch_resumable(
+    url: str, ext: str, headers: dict[str, str], intro: str = "下载", connections: int | None = None
+) -> Path:
+    """下载媒体流到缓存目录并返回完整文件的路径，中断时自动续传
+
+    connections 为分段下载的最大连接数，默认取配置；文件较小或服务器不支持 Range 时顺序下载。
+    返回的文件由调用方在使用完毕后删除；失败时保留 .part 文件，下次下载同一条流时继续。
+    本函数不加锁，同一条流可能被同时下载时请用 resumable_download。
+    """
+    target = content_path(url, ext)
+    part = target.with_name(target.name + PART_SUFFIX)
+    state = part.with_name(part.name + STATE_SUFFIX)
+    done_size = await asyncio.to_thread(_prepare, target)
+
+    connections = max(1, connections if connections is not None else int(cfg.download_connections.value))
+    total = None
+    if connections > 1 or done_size is not None or state.exists():
+        total = await _probe_length(url, headers)
+    if done_size is not None:
+        # 上次下载已通过长度校验，只是在转换阶段中断：长度与服务器一致时直接复用
+        if done_size == total:
+            logger.info(f"复用已下载完成的文件: {target.name}")
+            return target
+        await asyncio.to_thread(target.unlink)
+    if total is not None and (state.exists() or total >= 2 * SEGMENT_MIN_SIZE):
+        await SegmentedDownload(url, part, headers, total, connections, intro).run()
+    else:
+        if state.exists():
+            # 分段下载的文件是预分配的，长度不代表进度，无法改为顺序续传
+            state.unlink()
+            part.unlink(missing_ok=True)
+        total = await _fetch_sequential(url, part, headers, intro)
+
+    size = part.stat().st_size
+    if size != total:
+        raise IncompleteDownloadError(size, total)
+    part.replace(target)
+    logger.info(f"下载完成并通过长度校验: {target.name}（{size} 字节）")
+    return target
+
+
+@dataclass(eq=False)
+class _FileLock:
+    lock: asyncio.Lock
+    users: int = 0
+
+
+# 缓存文件路径 → 正在使用或等待使用它的下载（所有下载都在共享事件循环中执行，无需线程锁）
+_file_locks: dict[Path, _FileLock] = {}
+
+
+@contextlib.asynccontextmanager
+async def _lock_file(path: Path) -> AsyncIterator[None]:
+    entry = _file_locks.get(path)
+    if entry is None:
+        entry = _file_locks[path] = _FileLock(asyncio.Lock())
+    entry.users += 1
+    try:
+        async with entry.lock:
+            yield
+    finally:
+        # 最后一个使用者退出时移除，避免字典随下载过的流无限增长
+        entry.users -= 1
+        if not entry.users:
+            del _file_locks[path]
+
+
+@contextlib.asynccontextmanager
+async def resumable_download(
+    url: str, ext: str, headers: dict[str, str], intro: str = "下载", connections: int | None = None
+) -> AsyncIterator[Path]:
+    """独占同一条流的缓存文件下载（见 fetch_resumable），产出完整文件的路径，退出时删除该文件"""
+    async with _lock_file(content_path(url, ext)):
+        path = await fetch_resumable(url, ext, headers, intro, connections)
+        try:
+            yield path
+        finally:
+            await asyncio.to_thread(path.unlink, missing_ok=True)
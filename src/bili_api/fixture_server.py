@@ -0,0 +1,341 @@
+"""bilibili 请求的录制 / 回放服务器
+
+在本机运行一个 HTTP 服务，把 bilibili 的接口（空间投稿、搜索、视频信息、playurl 等）
+与媒体 CDN 的响应保存到目录中，之后离线回放，用于压测爬取、搜索与下载流程。
+
+请求地址的形式为 {base}/{原始域名}/{原始路径}?{原始参数}：
+
+- record 模式：转发到真实的 https://{原始域名}/...，保存响应后原样返回；
+- replay 模式：从目录中查找录制的响应返回，找不到时返回 404。
+
+两种模式都可以注入延迟、限流（超出速率的接口请求返回 412 风控）、随机 500 错误、
+媒体带宽限制与媒体连接中断。install() 让 src.bili_api 的所有请求改发到服务器：
+
+    python -m src.bili_api.fixture_server replay fixtures/ --port 8765
+    NEURO_BILI_FIXTURE=http://127.0.0.1:8765 python main.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Self
+from urllib.parse import parse_qsl, urlencode
+
+import aiohttp
+from aiohttp import web
+from bilibili_api import get_selected_client, register_client, select_client
+from bilibili_api.clients.AioHTTPClient import AioHTTPClient
+from loguru import logger
+
+from .common import rewrite_url, set_redirect_base
+
+# 设置该环境变量后，main.py 启动时会把请求转发到对应的服务器
+FIXTURE_ENV = "NEURO_BILI_FIXTURE"
+FIXTURE_CLIENT = "fixture"
+
+# 每次请求都会变化的签名、时间戳类参数，不参与匹配
+VOLATILE_PARAMS = frozenset(
+    {
+        "wts",
+        "w_rid",
+        "web_location",
+        "dm_img_list",
+        "dm_img_str",
+        "dm_cover_img_str",
+        "dm_img_inter",
+    }
+)
+# 媒体响应分块发送的大小（字节）
+CHUNK_SIZE = 64 * 1024
+
+Mode = Literal["replay", "record"]
+
+
+def is_api_host(netloc: str) -> bool:
+    """接口域名按参数匹配录制结果；其它（媒体 CDN）地址带有一次性签名，只按路径匹配"""
+    return netloc.split(":")[0].endswith("bilibili.com")
+
+
+@dataclass
+class FaultProfile:
+    """注入的故障与延迟"""
+
+    latency: float = 0.0  # 每个请求的固定延迟（秒）
+    jitter: float = 0.0  # 在固定延迟上叠加的随机延迟上限（秒）
+    rate_limit: int = 0  # 接口请求在 window 秒内超过该数量时返回风控，0 表示不限
+    window: float = 1.0
+    error_ratio: float = 0.0  # 随机返回 500 的比例
+    bandwidth: int = 0  # 媒体响应的带宽上限（字节/秒），0 表示不限
+    drop_after: int = 0  # 媒体响应发送该字节数后直接断开连接（模拟网络中断），0 表示不断开
+
+
+@dataclass
+class Fixture:
+    status: int
+    content_type: str
+    body: bytes
+
+
+@dataclass
+class ServerStats:
+    served: int = 0
+    missing: int = 0
+    recorded: int = 0
+    throttled: int = 0
+    errors: int = 0
+    dropped: int = 0
+    bytes_sent: int = 0
+    missing_urls: list[str] = field(default_factory=list)
+
+
+class FixtureStore:
+    """录制结果的目录存储：{root}/{域名}/{key}.json（元数据）+ {key}.body（响应体）"""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    @staticmethod
+    def _key(method: str, netloc: str, path: str, query: str) -> str:
+        if is_api_host(netloc):
+            params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+            query = urlencode(params)
+        else:
+            query = ""
+        return hashlib.sha1(f"{method} {path}?{query}".encode()).hexdigest()
+
+    def _paths(self, netloc: str, key: str) -> tuple[Path, Path]:
+        folder = self.root / netloc.replace(":", "_")
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def load(self, method: str, netloc: str, path: str, query: str) -> Fixture | None:
+        meta_path, body_path = self._paths(netloc, self._key(method, netloc, path, query))
+        if not meta_path.exists() and not is_api_host(netloc):
+            # 媒体文件录制时的域名可能与回放时不同（CDN 节点会变化），按路径在所有域名下查找
+            key = meta_path.name
+            meta_path = next(self.root.glob(f"*/{key}"), meta_path)
+            body_path = meta_path.with_suffix(".body")
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text("utf-8"))
+        return Fixture(meta["status"], meta["content_type"], body_path.read_bytes())
+
+    def save(self, method: str, netloc: str, path: str, query: str, fixture: Fixture) -> None:
+        meta_path, body_path = self._paths(netloc, self._key(method, netloc, path, query))
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        body_path.write_bytes(fixture.body)
+        meta = {
+            "method": method,
+            "url": f"https://{netloc}{path}" + (f"?{query}" if query else ""),
+            "status": fixture.status,
+            "content_type": fixture.content_type,
+            "recorded_at": int(time.time()),
+        }
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), "utf-8")
+
+
+class FixtureServer:
+    """在本机随机端口上运行的录制 / 回放服务器"""
+
+    def __init__(self, root: Path, mode: Mode = "replay", faults: FaultProfile | None = None) -> None:
+        self.store = FixtureStore(root)
+        self.mode = mode
+        self.faults = faults or FaultProfile()
+        self.stats = ServerStats()
+        self.base_url = ""
+        self._recent: deque[float] = deque()
+        self._runner: web.AppRunner | None = None
+        self._upstream: aiohttp.ClientSession | None = None
+
+    def _throttled(self) -> bool:
+        if self.faults.rate_limit <= 0:
+            return False
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > self.faults.window:
+            self._recent.popleft()
+        self._recent.append(now)
+        return len(self._recent) > self.faults.rate_limit
+
+    async def _record(self, request: web.Request, netloc: str, path: str) -> Fixture:
+        if self._upstream is None:
+            self._upstream = aiohttp.ClientSession(auto_decompress=True)
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "range", "accept-encoding")}
+        async with self._upstream.request(
+            request.method,
+            f"https://{netloc}{path}",
+            params=list(request.query.items()),
+            data=await request.read() or None,
+            headers=headers,
+        ) as resp:
+            fixture = Fixture(resp.status, resp.content_type, await resp.read())
+        self.store.save(request.method, netloc, path, request.query_string, fixture)
+        self.stats.recorded += 1
+        return fixture
+
+    async def _send_media(self, request: web.Request, fixture: Fixture) -> web.StreamResponse:
+        """发送媒体文件，支持单段 Range 请求与带宽限制"""
+        body = fixture.body
+        start, end = 0, len(body)
+        status = 200
+        if (range_header := request.headers.get("Range", "")).startswith("bytes="):
+            first, _, last = range_header[6:].split(",")[0].partition("-")
+            start = int(first) if first else max(len(body) - int(last), 0)
+            end = min(int(last) + 1, len(body)) if first and last else len(body)
+            if start >= len(body):
+                return web.Response(status=416, headers={"Content-Range": f"bytes */{len(body)}"})
+            status = 206
+
+        response = web.StreamResponse(status=status)
+        response.content_type = fixture.content_type
+        response.content_length = end - start
+        response.headers["Accept-Ranges"] = "bytes"
+        if status == 206:
+            response.headers["Content-Range"] = f"bytes {start}-{end - 1}/{len(body)}"
+        await response.prepare(request)
+        for offset in range(start, end, CHUNK_SIZE):
+            if 0 < self.faults.drop_after <= offset - start and request.transport is not None:
+                self.stats.dropped += 1
+                request.transport.close()
+                return response
+            chunk = body[offset : min(offset + CHUNK_SIZE, end)]
+            await response.write(chunk)
+            self.stats.bytes_sent += len(chunk)
+            if self.faults.bandwidth > 0:
+                await asyncio.sleep(len(chunk) / self.faults.bandwidth)
+        await response.write_eof()
+        return response
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        netloc = request.match_info["netloc"]
+        path = "/" + request.match_info["path"]
+
+        if delay := self.faults.latency + random.uniform(0, self.faults.jitter):
+            await asyncio.sleep(delay)
+        if is_api_host(netloc) and self._throttled():
+            self.stats.throttled += 1
+            return web.Response(status=412, text="request was banned")
+        if random.random() < self.faults.error_ratio:
+            self.stats.errors += 1
+            return web.Response(status=500)
+
+        if self.mode == "record":
+            fixture = await self._record(request, netloc, path)
+        elif (fixture := self.store.load(request.method, netloc, path, request.query_string)) is None:
+            self.stats.missing += 1
+            self.stats.missing_urls.append(f"{request.method} {netloc}{path}?{request.query_string}")
+            logger.warning(f"没有录制的响应: {request.method} {netloc}{path}")
+            return web.Response(status=404, text="fixture not found")
+
+        self.stats.served += 1
+        if not is_api_host(netloc) and fixture.status == 200:
+            return await self._send_media(request, fixture)
+        self.stats.bytes_sent += len(fixture.body)
+        return web.Response(status=fixture.status, body=fixture.body, content_type=fixture.content_type)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/{netloc}/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        # 自己创建监听套接字，port 为 0 时从套接字上读取系统分配的端口
+        sock = socket.create_server((host, port))
+        site = web.SockSite(self._runner, sock)
+        await site.start()
+        self.base_url = f"http://{host}:{sock.getsockname()[1]}"
+        return self.base_url
+
+    async def close(self) -> None:
+        if self._upstream is not None:
+            await self._upstream.close()
+            self._upstream = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+
+class FixtureClient(AioHTTPClient):
+    """把 bilibili_api 的请求改发到 FixtureServer 的请求客户端"""
+
+    async def request(self, method: str = "", url: str = "", *args, **kwargs):  # type: ignore[override]
+        return await super().request(method, rewrite_url(url), *args, **kwargs)
+
+    async def download_create(self, url: str = "", headers: dict | None = None) -> int:
+        return await super().download_create(rewrite_url(url), headers or {})
+
+
+_previous_client: str | None = None
+
+
+def install(base_url: str) -> None:
+    """让 src.bili_api 的所有请求（包括 bilibili_api 发出的）改发到 base_url"""
+    global _previous_client
+    if _previous_client is None:
+        _previous_client = get_selected_client()[0]
+    register_client(FIXTURE_CLIENT, FixtureClient)
+    set_redirect_base(base_url)
+    logger.info(f"bilibili 请求已转发到 {base_url}")
+
+
+def uninstall() -> None:
+    """恢复直接访问 bilibili"""
+    global _previous_client
+    set_redirect_base(None)
+    if _previous_client is not None:
+        select_client(_previous_client)
+        _previous_client = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="bilibili 请求的录制 / 回放服务器")
+    parser.add_argument("mode", choices=["replay", "record"])
+    parser.add_argument("root", type=Path, help="录制结果目录")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--error-ratio", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    parser.add_argument("--drop-after", type=int, default=0)
+    args = parser.parse_args()
+
+    faults = FaultProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        error_ratio=args.error_ratio,
+        bandwidth=args.bandwidth,
+        drop_after=args.drop_after,
+    )
+
+    async def serve() -> None:
+        server = FixtureServer(args.root, args.mode, faults)
+        base_url = await server.start(args.host, args.port)
+        logger.info(f"{args.mode} 服务器已启动: {base_url}（{FIXTURE_ENV}={base_url}）")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+            logger.info(f"统计: {server.stats}")
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
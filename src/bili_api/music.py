@@ -1,69 +1,175 @@
+import asyncio
 import contextlib
+import re
 import subprocess
-import uuid
 from pathlib import Path
 
-from bilibili_api import HEADERS, get_client, sync, video
+from bilibili_api import HEADERS, video
 from loguru import logger
 
-from src.config import CACHE_DIR, FFMPEG_PATH, MUSIC_DIR, VIDEO_DIR, DATA_DIR, cfg, subprocess_options
-from src.core.song_list import SongList
-from src.core.data_io import load_from_all_data
-from src.utils.text import fix_filename
+from src.config import FFMPEG_PATH, MUSIC_DIR, DATA_DIR, cfg, subprocess_options
+from src.core.song_list import SongList, SongQuery
+from src.core.catalog import get_catalog, load_catalog
+from src.core.fuzzy_index import get_fuzzy_index
+from src.utils.runtime import run_sync
+from src.utils.text import fix_filename, split_query
 
 from .common import get_credential
+from .downloader import resumable_download, stream_chunks
+from .scheduler import schedule
+from .video_info import get_video_info, get_video_info_sync
 
 
 @contextlib.asynccontextmanager
 async def download(url: str, ext: str, intro: str):
+    """下载媒体流并校验长度，退出时删除文件；中断后保留 .part 文件，下次从断点继续"""
     logger.info(f"Using ffmpeg: {FFMPEG_PATH}")
-    client = get_client()
-    dwn_id = await client.download_create(url, HEADERS)
-    current = 0
-    total = client.download_content_length(dwn_id)
-
-    cache_file = CACHE_DIR / f"{uuid.uuid4()}{ext}"
-    with open(cache_file, "wb") as temp_file:
-        logger.info(f"临时文件: {temp_file.name}")
-        while True:
-            current += temp_file.write(await client.download_chunk(dwn_id))
-            print(f"{intro} - {ext} [{current} / {total}]", end="\r")
-            if current == total:
-                break
-
-    try:
+    async with resumable_download(url, ext, HEADERS, f"{intro} - {ext}") as cache_file:
+        logger.info(f"临时文件: {cache_file}")
         yield cache_file
-    finally:
-        cache_file.unlink(missing_ok=True)
 
 
-async def download_music(bvid: str, output_file: Path, page_index: int = 0) -> None:
+# 目标格式可以直接封装（不重新编码）的音频编码
+COPY_COMPATIBLE_CODECS = {
+    "m4a": {"aac", "alac"},
+    "opus": {"opus"},
+    "ogg": {"vorbis", "opus", "flac"},
+    "mp3": {"mp3"},
+}
+# playurl 中 codecs 字段（RFC 6381 形式）与 ffmpeg 编码名的对应
+_PLAYURL_CODECS = {"mp4a": "aac", "ec-3": "eac3", "ac-3": "ac3", "flac": "flac", "opus": "opus"}
+_FFMPEG_AUDIO_CODEC = re.compile(r"Stream #\S+.*?: Audio: (\w+)")
+
+
+def _ffmpeg_command(input_file: str, output_file: Path, copy: bool = False) -> list[str]:
+    codec_args = ["-c:a", "copy"] if copy else []
+    return [str(FFMPEG_PATH), "-y", "-i", input_file, "-vn", *codec_args, str(output_file)]
+
+
+def can_copy_audio(codec: str | None, output_file: Path) -> bool:
+    """音频编码是否可以不经转码直接封装进 output_file 的格式"""
+    return codec is not None and codec in COPY_COMPATIBLE_CODECS.get(output_file.suffix.lstrip(".").lower(), ())
+
+
+def playurl_audio_codec(download_url_data: dict, url: str) -> str | None:
+    """从 playurl 接口返回的 DASH 信息中查找 url 对应音频流的编码"""
+    dash = download_url_data.get("dash") or {}
+    entries = list(dash.get("audio") or [])
+    entries += (dash.get("dolby") or {}).get("audio") or []
+    if flac := (dash.get("flac") or {}).get("audio"):
+        entries.append(flac)
+    for entry in entries:
+        if url in (entry.get("baseUrl"), entry.get("base_url"), *(entry.get("backupUrl") or [])):
+            codecs = str(entry.get("codecs") or "").split(".")[0].lower()
+            return _PLAYURL_CODECS.get(codecs, codecs or None)
+    return None
+
+
+async def probe_audio_codec(input_file: Path) -> str | None:
+    """用 ffmpeg 读取文件头，返回第一条音频流的编码名（如 aac），无法识别时返回 None"""
+    completed = await asyncio.to_thread(
+        subprocess.run,
+        [str(FFMPEG_PATH), "-hide_banner", "-i", str(input_file)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        **subprocess_options(),
+    )
+    match = _FFMPEG_AUDIO_CODEC.search(completed.stderr.decode("utf-8", "replace"))
+    return match[1].lower() if match else None
+
+
+async def convert_file(input_file: Path, output_file: Path, codec: str | None = None) -> None:
+    """把下载的媒体文件转换为 output_file 的格式，编码相同时只封装不转码，封装失败再转码"""
+    for copy in (True, False) if can_copy_audio(codec, output_file) else (False,):
+        # 在线程中执行，避免阻塞共享事件循环
+        completed = await asyncio.to_thread(
+            subprocess.run,
+            _ffmpeg_command(str(input_file), output_file, copy),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **subprocess_options(),
+        )
+        if completed.returncode == 0:
+            logger.info(f"{'直接封装' if copy else '转码'}为 {output_file.suffix}（音频编码 {codec}）")
+            return
+        if copy:
+            logger.warning(f"直接封装失败（ffmpeg 返回 {completed.returncode}），改为转码")
+    completed.check_returncode()
+
+
+async def transcode_stream(url: str, output_file: Path, intro: str, copy: bool = False) -> None:
+    """边下载边把数据写入 ffmpeg 的标准输入，下载与转码同时进行，不保存临时文件
+
+    copy 为 True 时只封装不转码。
+    """
+    logger.info(f"Using ffmpeg: {FFMPEG_PATH}（流式{'封装' if copy else '转码'}）")
+    proc = await asyncio.create_subprocess_exec(
+        *_ffmpeg_command("pipe:0", output_file, copy),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **subprocess_options(),
+    )
+    assert proc.stdin is not None
+    try:
+        async with contextlib.aclosing(stream_chunks(url, HEADERS, intro)) as chunks:
+            async for chunk in chunks:
+                proc.stdin.write(chunk)
+                # ffmpeg 处理不过来时在此等待，内存中只保留管道缓冲区大小的数据
+                await proc.stdin.drain()
+        proc.stdin.close()
+        returncode = await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        output_file.unlink(missing_ok=True)
+        raise
+    if returncode != 0:
+        output_file.unlink(missing_ok=True)
+        raise subprocess.CalledProcessError(returncode, _ffmpeg_command("pipe:0", output_file, copy))
+
+
+async def download_music(bvid: str, output_file: Path, page_index: int = 0, stream: bool | None = None) -> None:
+    """下载视频音频并转换为 output_file 的格式
+
+    stream 为 True 时边下载边转码（默认取配置），否则先下载到可续传的缓存文件再转换。
+    """
     # 实例化 Video 类
     v = video.Video(bvid, credential=get_credential())
-    # 获取视频下载链接
-    download_url_data = await v.get_download_url(page_index)
+    # 获取视频下载链接（分P 的 cid 取自共享的视频信息缓存，省去一次信息请求）
+    pages = (await get_video_info(bvid)).get("pages") or []
+    if page_index < len(pages) and "cid" in pages[page_index]:
+        cid = pages[page_index]["cid"]
+        download_url_data = await schedule("playurl", lambda: v.get_download_url(cid=cid))
+    else:
+        download_url_data = await schedule("playurl", lambda: v.get_download_url(page_index))
     # 解析视频下载信息
     detecter = video.VideoDownloadURLDataDetecter(data=download_url_data)
     streams = detecter.detect_best_streams()
     # 有 MP4 流 / FLV 流两种可能
-    async with (
-        download(streams[0].url, ".flv", "下载 FLV 音视频流")
-        if detecter.check_flv_mp4_stream()
-        else download(streams[1].url, ".m4s", "下载音频流")
-    ) as temp_file:
-        # 转换文件格式
-        subprocess.run(
-            [
-                str(FFMPEG_PATH),
-                "-y",
-                "-i",
-                str(temp_file),
-                str(output_file),
-            ],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            **subprocess_options(),
-        ).check_returncode()
+    if detecter.check_flv_mp4_stream():
+        url, ext, intro = streams[0].url, ".flv", "下载 FLV 音视频流"
+    else:
+        url, ext, intro = streams[1].url, ".m4s", "下载音频流"
+
+    codec = playurl_audio_codec(download_url_data, url)
+
+    if stream if stream is not None else cfg.download_streaming.value:
+        if can_copy_audio(codec, output_file):
+            try:
+                await transcode_stream(url, output_file, intro, copy=True)
+                logger.info(f"已下载为：{output_file}")
+                return
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"直接封装失败（ffmpeg 返回 {e.returncode}），重新下载并转码")
+            except (BrokenPipeError, ConnectionResetError) as e:
+                # ffmpeg 提前退出时，写入标准输入会因管道断开而失败
+                logger.warning(f"直接封装失败（{type(e).__name__}），重新下载并转码")
+        await transcode_stream(url, output_file, intro)
+    else:
+        async with download(url, ext, intro) as temp_file:
+            await convert_file(temp_file, output_file, codec or await probe_audio_codec(temp_file))
 
     logger.info(f"已下载为：{output_file}")
 
@@ -79,8 +185,7 @@ async def get_video_parts(bvid: str) -> list[dict]:
         如果只有一个分P，返回空列表
     """
     try:
-        v = video.Video(bvid, credential=get_credential())
-        info = await v.get_info()
+        info = await get_video_info(bvid)
 
         # 获取分P信息
         pages = info.get("pages", [])
@@ -111,12 +216,12 @@ def get_video_parts_sync(bvid: str) -> list[dict]:
     Returns:
         分P信息列表
     """
-    return sync(get_video_parts(bvid))
+    return run_sync(get_video_parts(bvid))
 
 
 def search_song_list(search_content: str) -> SongList | None:
     """
-    重写的搜索方法
+    重写的搜索方法（经视频目录的 FTS5 全文索引只取出命中的记录，不再读入整个目录）
 
     参数:
         search_result(str):搜索的关键字
@@ -127,19 +232,39 @@ def search_song_list(search_content: str) -> SongList | None:
             (None):未搜索到结果,返回空
     """
 
-    total_data = load_from_all_data(VIDEO_DIR)
-    if total_data is None:
-        return None
-    filter_list = cfg.filter_list.value if cfg.enable_filter.value else []
-    black_author_list = cfg.black_author_list.value
+    if not (tokens := split_query(search_content)):
+        return _apply_search_filters(load_catalog().query())
+    return _apply_search_filters(get_catalog().search_titles(tokens).query())
 
-    search_result_list = total_data
-    search_result_list.search_by_title(search_content)
 
-    search_result_list.unique_by_bv()
-    search_result_list.remove_blacklist(black_author_list, 1)
+def fuzzy_search_song_list(search_content: str, threshold: float = 0.5) -> tuple[SongList | None, float]:
+    """容错 / 拼音模糊搜索本地视频目录，结果按近似度从高到低排列
+
+    用于精确搜索无结果时在本地兜底，减少回退到网络搜索的次数。
+    返回 (结果, 过滤后结果中的最高近似度)，无结果时为 (None, 0.0)。
+    """
+    total_data = load_catalog()
+    index = get_fuzzy_index()
+    index.sync(total_data)
+
+    hits = index.search(search_content, threshold=threshold)
+    if not hits:
+        return None, 0.0
+    result = _apply_search_filters(total_data.query().candidates(bv for bv, _ in hits))
+    if result is None:
+        return None, 0.0
+    scores = dict(hits)
+    best = max(scores.get(record.bv, 0.0) for record in result)
+    logger.info(f"模糊搜索命中 {len(result)} 条，最高近似度 {best:.2f}")
+    return result, best
+
+
+def _apply_search_filters(query: SongQuery) -> SongList | None:
+    """应用过滤词与作者黑名单并执行查询，无结果时返回 None"""
     if cfg.enable_filter.value:
-        search_result_list.filter_data(filter_list, 0)
+        query.filter(cfg.filter_list.value, "title")
+    query.exclude([word for word in cfg.black_author_list.value if word], "author")
+    search_result_list = query.run()
 
     if len(search_result_list.get_data()) == 0:
         return None
@@ -147,10 +272,10 @@ def search_song_list(search_content: str) -> SongList | None:
     return search_result_list
 
 
-def run_music_download(
+async def download_song(
     index: int, search_list: SongList, file_type: str = "mp3", parts: list[int] | None = None
 ) -> bool:
-    """运行下载器
+    """下载搜索结果中的一首歌（协程版本，可在共享事件循环中并发执行多个）
 
     Args:
         index: 歌曲索引
@@ -184,10 +309,10 @@ def run_music_download(
             if output_file.exists():
                 logger.info(f"文件 {output_file} 已存在，执行覆盖操作。")
 
-            sync(download_music(bv, output_file, 0))
+            await download_music(bv, output_file, 0)
         else:
             # 下载指定的多个分P，获取分P信息以使用分P标题
-            parts_info = get_video_parts_sync(bv)
+            parts_info = await get_video_parts(bv)
 
             for part_num in parts:
                 part_index = part_num - 1  # 页码从1开始，索引从0开始
@@ -212,7 +337,7 @@ def run_music_download(
                 if output_file.exists():
                     logger.info(f"文件 {output_file} 已存在，执行覆盖操作。")
 
-                sync(download_music(bv, output_file, part_index))
+                await download_music(bv, output_file, part_index)
 
         return True
     except Exception:
@@ -220,23 +345,39 @@ def run_music_download(
         return False
 
 
+def run_music_download(
+    index: int, search_list: SongList, file_type: str = "mp3", parts: list[int] | None = None
+) -> bool:
+    """运行下载器（download_song 的同步版本）
+
+    Args:
+        index: 歌曲索引
+        search_list: 搜索结果列表
+        file_type: 文件类型
+        parts: 要下载的分P页码列表，None表示下载第一个分P或全部分P
+
+    Returns:
+        是否下载成功
+    """
+    return run_sync(download_song(index, search_list, file_type, parts))
+
+
 def _get_video_title_by_bvid(bvid: str) -> str:
     """通过 bvid 获取视频标题，失败时回退为 bvid"""
     try:
-        v = video.Video(bvid, credential=get_credential())
-        info = sync(v.get_info())
-        # 兼容不同结构
-        title = info.get("title") if isinstance(info, dict) else None
-        if not title and isinstance(info, dict) and "View" in info:
-            title = info["View"].get("title")
-        return title or bvid
+        return get_video_info_sync(bvid).get("title") or bvid
     except Exception:
         logger.exception(f"获取标题失败: {bvid}")
         return bvid
 
 
-def run_music_download_by_bvid(bvid: str, file_type: str = "mp3", check_exists: bool = True) -> bool:
-    """直接根据 BV 号下载音频"""
+def run_music_download_by_bvid(
+    bvid: str, file_type: str = "mp3", check_exists: bool = True, stream: bool | None = None
+) -> bool:
+    """直接根据 BV 号下载音频
+
+    stream 为 True 时边下载边转码，None 表示取配置（见 download_music）
+    """
     try:
         title = _get_video_title_by_bvid(bvid)
         safe_title = fix_filename(title).replace(" ", "").replace("_", "", 1)
@@ -252,7 +393,7 @@ def run_music_download_by_bvid(bvid: str, file_type: str = "mp3", check_exists:
             logger.info(f"文件已存在，跳过下载: {output_file}")
             return True
 
-        sync(download_music(bvid, output_file))
+        run_sync(download_music(bvid, output_file, stream=stream))
         return True
     except Exception:
         logger.exception(f"下载失败: {bvid}")
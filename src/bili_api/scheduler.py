@@ -0,0 +1,232 @@
+"""Bilibili 请求调度：限速、重试与风控退避
+
+src.bili_api 中的所有网络请求都通过 schedule() 发出：
+
+- 每个接口一个令牌桶，限制请求速率与突发量；
+- 网络错误、超时与风控响应按带随机抖动的指数退避重试；
+- 识别到风控（HTTP 412 / 429，code -352 / -412）时，全局降低所有接口的请求速率，
+  之后一段时间没有再触发风控则逐步恢复。
+
+令牌桶与降速状态是线程安全的：请求通常在共享异步运行时（src.utils.runtime）中执行，
+但离线压测等场景也会在其它事件循环中调用。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import aiohttp
+from loguru import logger
+
+# 风控相关的 HTTP 状态码与接口返回码
+RISK_STATUS = frozenset({412, 429})
+RISK_CODES = frozenset({-352, -412})
+
+# 重试参数：最大重试次数、退避基数与上限（秒）
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+# 降速参数：每次触发风控速率减半，最多降到 1/MAX_SLOWDOWN；RECOVERY_INTERVAL 秒内未再触发则恢复一半
+MAX_SLOWDOWN = 16.0
+RECOVERY_INTERVAL = 30.0
+RISK_DEBOUNCE = 1.0
+
+
+class RiskControlError(Exception):
+    """接口返回了风控响应（调用方在解析响应时发现后抛出）"""
+
+    def __init__(self, endpoint: str, detail: object = None) -> None:
+        super().__init__(f"{endpoint} 触发风控: {detail}")
+        self.endpoint = endpoint
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    rate: float  # 每秒请求数
+    burst: int  # 令牌桶容量
+
+
+DEFAULT_POLICY = EndpointPolicy(rate=2.0, burst=4)
+ENDPOINT_POLICIES: dict[str, EndpointPolicy] = {
+    "search": EndpointPolicy(rate=1.0, burst=2),
+    "space": EndpointPolicy(rate=1.0, burst=3),
+    "user_info": EndpointPolicy(rate=2.0, burst=4),
+    "view": EndpointPolicy(rate=4.0, burst=8),
+    "playurl": EndpointPolicy(rate=2.0, burst=4),
+    "page": EndpointPolicy(rate=1.0, burst=2),
+}
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, slowdown: float = 1.0) -> float:
+        """尝试取走一个令牌：成功返回 0，否则返回大约还需等待的秒数"""
+        rate = self.rate / slowdown
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    def drain(self) -> None:
+        """清空令牌，使等待中的请求按（降速后的）速率重新排队"""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+def is_risk_control(exc: BaseException) -> bool:
+    if isinstance(exc, RiskControlError):
+        return True
+    # bilibili_api 的 NetworkException / ResponseCodeException 与 aiohttp 的 ClientResponseError
+    return getattr(exc, "status", None) in RISK_STATUS or getattr(exc, "code", None) in RISK_CODES
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if is_risk_control(exc):
+        return True
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, aiohttp.ClientConnectionError)):
+        return True
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and status >= 500
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    retries: int = 0
+    risk_hits: int = 0
+    failures: int = 0
+
+
+class RequestScheduler:
+    """按接口限速，并在失败时重试的请求调度器"""
+
+    def __init__(
+        self,
+        policies: dict[str, EndpointPolicy] | None = None,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_cap: float = BACKOFF_CAP,
+    ) -> None:
+        self.policies = dict(ENDPOINT_POLICIES if policies is None else policies)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._stats: dict[str, EndpointStats] = {}
+        self._slowdown = 1.0
+        self._last_risk = 0.0
+        self._last_escalation = 0.0
+
+    @property
+    def slowdown(self) -> float:
+        """当前的全局降速倍数（1 表示未降速）"""
+        return self._slowdown
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        with self._lock:
+            if (bucket := self._buckets.get(endpoint)) is None:
+                policy = self.policies.get(endpoint, DEFAULT_POLICY)
+                bucket = self._buckets[endpoint] = TokenBucket(policy.rate, policy.burst)
+                self._stats[endpoint] = EndpointStats()
+            return bucket
+
+    def _on_risk_control(self, endpoint: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._last_risk = now
+            self._stats[endpoint].risk_hits += 1
+            # 同一批并发请求先后收到的风控响应只降速一次
+            escalate = now - self._last_escalation >= RISK_DEBOUNCE and self._slowdown < MAX_SLOWDOWN
+            if escalate:
+                self._slowdown = min(self._slowdown * 2, MAX_SLOWDOWN)
+                self._last_escalation = now
+            slowdown = self._slowdown
+            buckets = list(self._buckets.values())
+        for bucket in buckets:
+            bucket.drain()
+        if escalate:
+            logger.warning(f"{endpoint} 触发风控，所有接口降速为 1/{slowdown:g}")
+
+    def _on_success(self) -> None:
+        if self._slowdown == 1.0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_risk >= RECOVERY_INTERVAL:
+                self._slowdown = max(self._slowdown / 2, 1.0)
+                self._last_risk = now
+                logger.info(f"风控解除中，请求降速恢复为 1/{self._slowdown:g}")
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt)) * self._slowdown
+
+    async def call[T](self, endpoint: str, factory: Callable[[], Awaitable[T]], retries: int | None = None) -> T:
+        """限速执行 factory() 产生的请求，可重试的错误按退避策略重试
+
+        factory 每次调用都必须创建一个新的协程。
+        """
+        bucket = self._bucket(endpoint)
+        stats = self._stats[endpoint]
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            # 每次醒来都按当前的降速倍数重新检查，等待期间触发的降速会立即生效
+            while (wait := bucket.take(self._slowdown)) > 0:
+                await asyncio.sleep(wait * random.uniform(1.0, 1.2))
+            stats.requests += 1
+            try:
+                result = await factory()
+            except Exception as e:
+                if is_risk_control(e):
+                    self._on_risk_control(endpoint)
+                if not is_retryable(e) or attempt >= retries:
+                    stats.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                stats.retries += 1
+                logger.debug(f"{endpoint} 请求失败（{type(e).__name__}: {e}），{delay:.1f} 秒后第 {attempt} 次重试")
+                await asyncio.sleep(delay)
+            else:
+                self._on_success()
+                return result
+
+    def stats(self) -> dict[str, EndpointStats]:
+        with self._lock:
+            return {name: EndpointStats(**vars(stats)) for name, stats in self._stats.items()}
+
+
+_scheduler: RequestScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """获取进程内共享的请求调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+async def schedule[T](endpoint: str, factory: Callable[[], Awaitable[T]], retries: int | None = None) -> T:
+    """通过共享调度器发出请求"""
+    return await get_scheduler().call(endpoint, factory, retries)
@@ -1,53 +1,165 @@
+"""bilibili 关键词搜索
+
+每个 (关键词, 页码) 的搜索结果缓存在持久化缓存中：
+- 缓存时间未超过 cfg.search_cache_ttl 时直接使用；
+- 超过 TTL 但未超过 SEARCH_CACHE_STALE 时先返回旧结果，同时在后台重新请求并写入视频目录
+  （stale-while-revalidate）；
+- 更旧或不存在时才同步请求网络。
+
+搜索页只在写入视频目录成功后才写入缓存：命中缓存的页一定已经在视频目录中。
+"""
+
 import asyncio
-from datetime import datetime
+import sqlite3
+import threading
+from collections.abc import Callable
 
 from bilibili_api.search import SearchObjectType, search_by_type
 from bs4 import BeautifulSoup
 from loguru import logger
 
-from src.config import VIDEO_DIR, cfg
+from src.config import cfg
+from src.core.catalog import SEARCH_SOURCE, get_catalog
 from src.core.song_list import SongList
+from src.utils.cache import PersistentTTLCache, get_persistent_cache
+from src.utils.runtime import submit
 
+from .scheduler import schedule
 
-async def search_page(search_content: str, page: int) -> list[dict]:
+# 过期的搜索结果在此时长内仍可先行展示（秒）
+SEARCH_CACHE_STALE = 7 * 24 * 3600
+
+_revalidating: set[str] = set()
+_revalidating_lock = threading.Lock()
+
+
+def _search_cache() -> PersistentTTLCache:
+    return get_persistent_cache("search_pages", cfg.search_cache_ttl.value)
+
+
+def _cache_key(search_content: str, page: int) -> str:
+    return f"{search_content.strip().lower()}\n{page}"
+
+
+async def _fetch_page(search_content: str, page: int) -> list[dict] | None:
+    """请求一页搜索结果，失败时返回 None"""
     try:
-        page_data = await search_by_type(
-            keyword=f"neuro {search_content}",
-            search_type=SearchObjectType.VIDEO,
-            page=page,
-            page_size=10,
+        page_data = await schedule(
+            "search",
+            lambda: search_by_type(
+                keyword=f"neuro {search_content}",
+                search_type=SearchObjectType.VIDEO,
+                page=page,
+                page_size=10,
+            ),
         )
     except Exception:
         logger.opt(exception=True).warning(f"搜索 {search_content} 第 {page} 页时发生错误")
-        return []
+        return None
 
     result = [
         {
             "title": BeautifulSoup(item["title"], "html.parser").get_text(strip=True),
             "author": item["author"],
-            "date": datetime.fromtimestamp(item["pubdate"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "date": int(item["pubdate"]),
             "url": f"https://www.bilibili.com/video/{item['bvid']}/",
             "bv": item["bvid"],
         }
-        for item in page_data["result"]
+        for item in page_data.get("result") or []
     ]
     logger.info(f"搜索 {search_content} 第 {page} 页成功，找到 {len(result)} 条结果")
     return result
 
 
-async def search_on_bilibili(search_content: str) -> None:
+def _store_results(songs: SongList, search_content: str, fetched: dict[int, list[dict]]) -> None:
+    """将搜索结果写入视频目录，成功后再把从网络获取的页写入缓存"""
+    get_catalog().upsert(songs.get_data(), SEARCH_SOURCE)
+
+    try:
+        _search_cache().set_many({_cache_key(search_content, page): result for page, result in fetched.items()})
+    except sqlite3.Error:
+        logger.opt(exception=True).warning("写入搜索结果缓存失败")
+
+
+def _revalidate_in_background(search_content: str, page: int) -> None:
+    """在共享事件循环中重新请求已过期的搜索页，同一页同时只刷新一次"""
+    key = _cache_key(search_content, page)
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    async def run() -> None:
+        try:
+            if (result := await _fetch_page(search_content, page)) is not None:
+                songs = SongList()
+                for item in result:
+                    songs.append_info(item)
+                await asyncio.to_thread(_store_results, songs, search_content, {page: result})
+        except (sqlite3.Error, OSError):
+            logger.exception(f"后台刷新搜索 {search_content} 第 {page} 页失败")
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    submit(run())
+
+
+async def _cached_search_page(search_content: str, page: int) -> tuple[list[dict] | None, bool]:
+    """返回 (搜索结果, 是否来自缓存)，请求失败时搜索结果为 None"""
+    try:
+        entry = _search_cache().get_entry(_cache_key(search_content, page))
+    except sqlite3.Error:
+        logger.opt(exception=True).warning("读取搜索结果缓存失败")
+        entry = None
+
+    if entry is not None:
+        result, age = entry
+        if age <= cfg.search_cache_ttl.value:
+            return result, True
+        if age <= SEARCH_CACHE_STALE:
+            logger.debug(f"搜索 {search_content} 第 {page} 页的缓存已过期，先使用旧结果并在后台刷新")
+            _revalidate_in_background(search_content, page)
+            return result, True
+
+    return await _fetch_page(search_content, page), False
+
+
+async def search_page(search_content: str, page: int) -> list[dict]:
+    result, _ = await _cached_search_page(search_content, page)
+    return result or []
+
+
+async def search_on_bilibili(search_content: str, is_cancelled: Callable[[], bool] | None = None) -> bool:
+    """搜索 bilibili 并把结果写入视频目录；is_cancelled 返回 True 时放弃写入
+
+    返回是否每一页都已取得并写入（或命中缓存）；部分页请求失败、取消或出错时返回 False，
+    已取得的页仍会写入。
+    """
     songs = SongList()
 
     try:
-        for data in await asyncio.gather(
-            *[search_page(search_content, page) for page in range(1, cfg.search_page.value + 1)]
-        ):
-            for item in data:
+        pages = await asyncio.gather(
+            *[_cached_search_page(search_content, page) for page in range(1, cfg.search_page.value + 1)]
+        )
+        if all(from_cache for _, from_cache in pages):
+            # 只有写入视频目录成功的页才会进入缓存
+            logger.info(f"搜索 {search_content} 命中缓存")
+            return True
+
+        for data, _ in pages:
+            for item in data or []:
                 songs.append_info(item)
 
-        songs.append_list(SongList(VIDEO_DIR / "search_data.json"))
-        songs.unique_by_bv()
-        songs.save_list(VIDEO_DIR / "search_data.json")
+        if is_cancelled is not None and is_cancelled():
+            # 取消时不写入缓存，下次搜索同一关键词会重新请求
+            logger.info(f"搜索 {search_content} 已取消，不写入视频目录")
+            return False
+        fetched = {
+            page: data for page, (data, from_cache) in enumerate(pages, 1) if not from_cache and data is not None
+        }
+        await asyncio.to_thread(_store_results, songs, search_content, fetched)
     except Exception as e:
         logger.opt(exception=True).error(f"搜索 {search_content} 失败: {e}")
-        return
+        return False
+    return all(data is not None for data, _ in pages)
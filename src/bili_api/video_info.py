@@ -0,0 +1,354 @@
+"""按 BV 号批量获取视频信息
+
+通过 JSON 接口（x/web-interface/view）获取标题、作者与发布时间，不再下载并解析整个网页。
+所有请求复用共享异步运行时的连接池，并限制并发数；接口失败的 BV 回退到网页解析。
+获取到的信息持久化缓存（METADATA_TTL 内有效），再次爬取时只请求从未获取过或已过期的 BV。
+
+VideoInfoCache 缓存完整的视频信息（标题、封面、分P 等），供标题查询、分P 选择、
+封面下载与下载流程共用：内存 LRU + 磁盘缓存，并发请求同一 BV 时只发起一次请求。
+"""
+
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from typing import Any, cast
+
+import aiohttp
+from bilibili_api import video
+from bs4 import BeautifulSoup, Tag
+from loguru import logger
+
+from src.config import USER_AGENT, cfg
+from src.core.song_list import SongList
+from src.utils.cache import PersistentTTLCache, get_persistent_cache
+from src.utils.runtime import get_http_session, run_sync
+from src.utils.text import contain_text, parse_timestamp
+
+from .common import get_credential, rewrite_url
+from .scheduler import RISK_CODES, RiskControlError, schedule
+
+VIEW_API = "https://api.bilibili.com/x/web-interface/view"
+
+# 默认并发参数：同时进行的请求数、单个请求超时（秒）
+CONCURRENCY = 8
+REQUEST_TIMEOUT = 10
+
+# 已发布视频的标题 / 作者 / 发布时间几乎不会变化，缓存 30 天
+METADATA_TTL = 30 * 24 * 3600
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def get_metadata_cache() -> PersistentTTLCache:
+    """bv → 视频信息 的持久化缓存"""
+    return get_persistent_cache("video_metadata", METADATA_TTL)
+
+
+def video_url(bv: str) -> str:
+    return f"https://www.bilibili.com/video/{bv}/"
+
+
+def _log_progress(done: int, total: int) -> None:
+    step = max(total // 10, 1)
+    if done == total or done % step == 0:
+        logger.info(f"扩展包视频信息获取进度 {done}/{total}")
+
+
+def _cookies() -> dict[str, str]:
+    cookies = {
+        "SESSDATA": cfg.bili_sessdata.value,
+        "bili_jct": cfg.bili_jct.value,
+        "buvid3": cfg.bili_buvid3.value,
+    }
+    return {k: v for k, v in cookies.items() if v}
+
+
+def _parse_video_page(html: str, url: str, words_set=None):
+    """从视频网页中解析详细信息(title,author,date)"""
+    try:
+        soup = BeautifulSoup(html, "lxml")
+        if not (h1 := soup.find("h1", class_="video-title special-text-indent")):
+            return
+
+        # 获取标题
+        video_title = str(cast(Tag, h1).get("data-title"))
+        # 获取作者(联合投稿可能失败)
+        video_author = soup.find("a", class_="up-name")
+        if video_author is not None:
+            video_author = video_author.getText()  # 调用 getText 方法获取实际文本
+            video_author = video_author.strip()
+        else:
+            logger.debug(f"未找到作者名: {url}")
+            video_author = "Unknown"
+        # 获取发布时间
+        video_date = soup.find("div", class_="pubdate-ip-text")
+        if video_date is not None:
+            video_date = parse_timestamp(video_date.getText())  # 爬取的日期文本在此统一转换为时间戳
+        else:
+            logger.debug(f"未找到发布日期: {url}")
+            video_date = 0
+
+        if words_set is None or contain_text(words_set, video_title):
+            return {"title": video_title, "author": video_author, "date": video_date}
+        else:
+            logger.debug(f"未识别到关键词: {url}")
+            return None
+
+    except Exception:
+        logger.exception("提取信息时出错")
+        return None
+
+
+async def fetch_video_page(url: str) -> str:
+    """下载视频网页，请求失败（含风控状态码）时抛出异常，交给调度器重试"""
+    session = await get_http_session()
+    async with session.get(
+        rewrite_url(url),
+        headers={"User-Agent": USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    ) as resp:
+        resp.raise_for_status()
+        return await resp.text()
+
+
+async def fetch_video_info(
+    session: aiohttp.ClientSession,
+    bv: str,
+    api: str = VIEW_API,
+    timeout: float = REQUEST_TIMEOUT,
+    cookies: dict[str, str] | None = None,
+) -> dict | None:
+    """通过 JSON 接口获取单个视频的信息，视频不可用时返回 None，触发风控时抛出 RiskControlError"""
+    async with session.get(
+        rewrite_url(api),
+        params={"bvid": bv},
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        cookies=cookies,
+    ) as resp:
+        resp.raise_for_status()
+        payload = await resp.json(content_type=None)
+    if payload.get("code") in RISK_CODES:
+        raise RiskControlError("view", payload.get("message"))
+    if payload.get("code") != 0:
+        logger.debug(f"获取视频 {bv} 信息失败: {payload.get('code')} {payload.get('message')}")
+        return None
+    data = payload["data"]
+    get_video_info_cache().put(bv, data)
+    return {
+        "title": data["title"],
+        "author": data["owner"]["name"],
+        "date": int(data["pubdate"]),
+        "url": video_url(bv),
+        "bv": bv,
+    }
+
+
+async def _resolve_one(session: aiohttp.ClientSession, bv: str, timeout: float) -> dict | None:
+    try:
+        if (
+            info := await schedule("view", lambda: fetch_video_info(session, bv, timeout=timeout, cookies=_cookies()))
+        ) is not None:
+            return info
+    except (aiohttp.ClientError, TimeoutError, RiskControlError, ValueError, KeyError, TypeError):
+        # 请求失败、重试后仍被风控，或返回的 JSON 缺少字段
+        logger.opt(exception=True).debug(f"接口获取视频 {bv} 信息出错，改为解析网页")
+
+    # 接口被风控或返回异常时，回退到原有的网页解析
+    url = video_url(bv)
+    # 只把网络请求交给调度器，错误不能在内部吞掉，否则调度器无法感知风控并重试
+    try:
+        html = await schedule("page", lambda: fetch_video_page(url))
+    except (aiohttp.ClientError, TimeoutError, ValueError):
+        logger.opt(exception=True).warning(f"获取视频网页失败: {url}")
+        return None
+    info = await asyncio.to_thread(_parse_video_page, html, url)
+    if info is not None:
+        info["url"] = url
+        info["bv"] = bv
+    return info
+
+
+async def resolve_bvs(
+    bvs: Iterable[str],
+    *,
+    concurrency: int = CONCURRENCY,
+    timeout: float = REQUEST_TIMEOUT,
+    progress: ProgressCallback | None = _log_progress,
+    refresh: bool = False,
+) -> SongList:
+    """并发获取一组 BV 的视频信息，结果按输入顺序返回（获取失败的 BV 被跳过）
+
+    参数:
+        refresh: 为 True 时忽略缓存，全部重新请求
+        concurrency: 同时进行的请求数上限
+        timeout: 单个请求的超时时间（秒）
+        progress: 每完成一个 BV 调用一次 progress(已完成数, 总数)
+    """
+    bv_list = list(dict.fromkeys(bvs))
+    song_list = SongList()
+    if not bv_list:
+        return song_list
+
+    cache = get_metadata_cache()
+    try:
+        results: dict[str, dict] = {} if refresh else cache.get_many(bv_list)
+    except sqlite3.Error:
+        logger.opt(exception=True).warning("读取视频信息缓存失败")
+        results = {}
+    pending = [bv for bv in bv_list if bv not in results]
+    logger.info(f"扩展包视频 {len(bv_list)} 个，缓存命中 {len(results)} 个，需要请求 {len(pending)} 个")
+
+    fetched: dict[str, dict] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def worker(session: aiohttp.ClientSession, bv: str) -> None:
+        nonlocal done
+        async with semaphore:
+            info = await _resolve_one(session, bv, timeout)
+        if info is not None:
+            fetched[bv] = info
+        done += 1
+        if progress is not None:
+            progress(done, len(pending))
+
+    if pending:
+        session = await get_http_session()
+        await asyncio.gather(*(worker(session, bv) for bv in pending))
+
+    if fetched:
+        try:
+            cache.set_many(fetched)
+        except sqlite3.Error:
+            logger.opt(exception=True).warning("写入视频信息缓存失败")
+        results.update(fetched)
+
+    for bv in bv_list:
+        if (info := results.get(bv)) is not None:
+            song_list.append_info(info)
+    logger.info(f"扩展包视频信息获取完成，成功 {len(song_list)}/{len(bv_list)} 个")
+    return song_list
+
+
+# 完整视频信息的缓存参数：内存 LRU 容量、磁盘缓存有效期（秒）
+VIDEO_INFO_LRU_SIZE = 256
+VIDEO_INFO_TTL = 7 * 24 * 3600
+
+# 只保留会用到的字段，避免把简介、统计数据等整段写入磁盘缓存
+_INFO_KEYS = ("bvid", "aid", "title", "pic", "owner", "pubdate", "duration", "pages")
+_PAGE_KEYS = ("cid", "page", "part", "duration")
+
+
+def _compact_info(info: dict[str, Any]) -> dict[str, Any]:
+    if "View" in info and isinstance(info["View"], dict):
+        info = info["View"]
+    compact = {key: info[key] for key in _INFO_KEYS if key in info}
+    compact["pages"] = [{key: page[key] for key in _PAGE_KEYS if key in page} for page in info.get("pages") or []]
+    return compact
+
+
+class VideoInfoCache:
+    """以 BV 号为键的视频信息缓存
+
+    查询顺序：内存 LRU → 磁盘缓存 → 网络。同一 BV 的并发请求（包括来自不同线程、
+    不同事件循环的请求）共享同一次网络获取。
+    """
+
+    def __init__(self, maxsize: int = VIDEO_INFO_LRU_SIZE, ttl: float = VIDEO_INFO_TTL) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._lru: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._inflight: dict[str, Future[dict[str, Any]]] = {}
+        self._disk = get_persistent_cache("video_info", ttl)
+
+    def _remember(self, bvid: str, info: dict[str, Any]) -> None:
+        with self._lock:
+            self._lru[bvid] = info
+            self._lru.move_to_end(bvid)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def peek(self, bvid: str) -> dict[str, Any] | None:
+        """只查询内存与磁盘缓存，不发起网络请求"""
+        with self._lock:
+            if (info := self._lru.get(bvid)) is not None:
+                self._lru.move_to_end(bvid)
+                return info
+        try:
+            info = self._disk.get(bvid)
+        except sqlite3.Error:
+            logger.opt(exception=True).warning("读取视频信息磁盘缓存失败")
+            info = None
+        if info is not None:
+            self._remember(bvid, info)
+        return info
+
+    def put(self, bvid: str, info: dict[str, Any]) -> dict[str, Any]:
+        """写入一条（其他途径获取到的）视频信息，返回精简后的信息"""
+        compact = _compact_info(info)
+        self._remember(bvid, compact)
+        try:
+            self._disk.set(bvid, compact)
+        except sqlite3.Error:
+            logger.opt(exception=True).warning("写入视频信息磁盘缓存失败")
+        return compact
+
+    def clear(self) -> None:
+        """清空内存与磁盘缓存"""
+        with self._lock:
+            self._lru.clear()
+        self._disk.clear()
+
+    async def get(self, bvid: str, refresh: bool = False) -> dict[str, Any]:
+        """获取视频信息，失败时抛出异常"""
+        if not refresh and (info := self.peek(bvid)) is not None:
+            return info
+
+        with self._lock:
+            future = self._inflight.get(bvid)
+            owner = future is None
+            if owner:
+                future = self._inflight[bvid] = Future()
+        assert future is not None
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            v = video.Video(bvid, credential=get_credential())
+            info = self.put(bvid, await schedule("view", v.get_info))
+            future.set_result(info)
+            return info
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(bvid, None)
+
+
+_video_info_cache: VideoInfoCache | None = None
+_video_info_cache_lock = threading.Lock()
+
+
+def get_video_info_cache() -> VideoInfoCache:
+    """获取进程内共享的视频信息缓存"""
+    global _video_info_cache
+    with _video_info_cache_lock:
+        if _video_info_cache is None:
+            _video_info_cache = VideoInfoCache()
+        return _video_info_cache
+
+
+async def get_video_info(bvid: str) -> dict[str, Any]:
+    """获取视频信息（标题、封面、分P 等），优先使用缓存"""
+    return await get_video_info_cache().get(bvid)
+
+
+def get_video_info_sync(bvid: str) -> dict[str, Any]:
+    """同步方式获取视频信息"""
+    if (info := get_video_info_cache().peek(bvid)) is not None:
+        return info
+    return run_sync(get_video_info(bvid))
@@ -1,148 +1,240 @@
 import asyncio
-import threading
-from datetime import datetime
-from typing import cast
+import sqlite3
 
-import requests
-from bilibili_api import sync
 from bilibili_api.user import User
-from bs4 import BeautifulSoup, Tag
 from loguru import logger
 
-from src.config import VIDEO_DIR, cfg, USER_AGENT
+from src.config import VIDEO_DIR, cfg
 from src.core.song_list import SongList
+from src.core.catalog import EXTEND_SOURCE, get_catalog, user_source
 from src.core.data_io import load_extend
-from src.utils.text import contain_text
+from src.utils.cache import PersistentTTLCache, get_persistent_cache
+from src.utils.matcher import get_matcher
+from src.utils.runtime import run_sync
 
 from .common import get_credential
+from .scheduler import schedule
+from .video_info import resolve_bvs
 
 remove_urls_index = []
 
 
-def resolve_url_to_info(url, words_set=None):
-    """解析视频url并转换为详细信息(title,author,date)"""
-    try:
-        headers = {"User-Agent": USER_AGENT}
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "lxml")
-        if not (h1 := soup.find("h1", class_="video-title special-text-indent")):
-            return
-
-        # 获取标题
-        video_title = str(cast(Tag, h1).get("data-title"))
-        # 获取作者(联合投稿可能失败)
-        video_author = soup.find("a", class_="up-name")
-        if video_author is not None:
-            video_author = video_author.getText()  # 调用 getText 方法获取实际文本
-            video_author = video_author.strip()
-        else:
-            logger.debug(f"未找到作者名: {url}")
-            video_author = "Unknown"
-        # 获取发布时间
-        video_date = soup.find("div", class_="pubdate-ip-text")
-        if video_date is not None:
-            video_date = video_date.getText()  # 调用 getText 方法获取实际文本
-        else:
-            logger.debug(f"未找到发布日期: {url}")
-            video_date = "Unknown"
-
-        if words_set is None or contain_text(words_set, video_title):
-            return {"title": video_title, "author": video_author, "date": video_date}
-        else:
-            logger.debug(f"未识别到关键词: {url}")
-            return None
-
-    except Exception:
-        logger.exception("提取信息时出错")
-        return None
-
-
-async def get_user_videos(user_id: int, words_set: list[str] | None = None, page: int = 1):
-    """获取指定用户的视频信息"""
+# 每页投稿数（接口上限 50）与全量回填时单个 UP 主同时请求的页数
+UP_PAGE_SIZE = 50
+UP_PAGE_CONCURRENCY = 3
+
+
+def _vlist(data: dict) -> list[dict]:
+    return (data.get("list") or {}).get("vlist") or []
+
+
+async def _fetch_up_pages(user: User, backfill: bool, watermark: tuple[str, int] | None) -> tuple[list[dict], int]:
+    """按发布时间从新到旧获取投稿，返回 (投稿列表, 请求页数)
+
+    增量模式逐页向后翻，遇到水位线（上次同步到的最新投稿）即停止；
+    全量回填或首次同步时获取全部页，第一页之后的页面并发请求。
+    """
+    first = await schedule("space", lambda: user.get_videos(pn=1, ps=UP_PAGE_SIZE))
+    items = _vlist(first)
+    total = int((first.get("page") or {}).get("count", len(items)))
+    pages = max((total + UP_PAGE_SIZE - 1) // UP_PAGE_SIZE, 1)
+
+    if backfill or watermark is None:
+        semaphore = asyncio.Semaphore(UP_PAGE_CONCURRENCY)
+
+        async def fetch(pn: int) -> list[dict]:
+            async with semaphore:
+                return _vlist(await schedule("space", lambda pn=pn: user.get_videos(pn=pn, ps=UP_PAGE_SIZE)))
+
+        for page_items in await asyncio.gather(*(fetch(pn) for pn in range(2, pages + 1))):
+            items.extend(page_items)
+        return items, pages
+
+    wm_bv, wm_created = watermark
+    result: list[dict] = []
+    pn = 1
+    while True:
+        for item in items:
+            if item["bvid"] == wm_bv or int(item["created"]) < wm_created:
+                return result, pn
+            result.append(item)
+        pn += 1
+        if pn > pages or not items:
+            return result, pn - 1
+        items = _vlist(await schedule("space", lambda pn=pn: user.get_videos(pn=pn, ps=UP_PAGE_SIZE)))
+
+
+async def get_user_videos(user_id: int, words_set: list[str] | None = None, backfill: bool = False) -> None:
+    """同步指定用户的投稿视频信息
+
+    参数:
+        words_set: 标题需包含其中任意一个词才会被记录，None 表示不过滤
+        backfill: 为 True 时忽略水位线，重新遍历全部投稿页
+    """
     user = User(user_id, credential=get_credential())
-    info = await user.get_user_info()
-    data = await user.get_videos(pn=page)
+    catalog = get_catalog()
+    watermark = catalog.get_watermark(user_id)
+    items, pages = await _fetch_up_pages(user, backfill, watermark)
 
+    matcher = get_matcher(words_set, ignore_case=False) if words_set is not None else None
     videos = SongList()
-    for item in data["list"]["vlist"]:
-        if words_set is not None and not contain_text(words_set, item["title"]):
+    for item in items:
+        if matcher is not None and not matcher.search(item["title"]):
             continue
 
         song_info = {
             "title": item["title"],
             "author": item["author"],
-            "date": datetime.fromtimestamp(item["created"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "date": int(item["created"]),
             "url": f"https://www.bilibili.com/video/{item['bvid']}/",
             "bv": item["bvid"],
         }
         videos.append_info(song_info)
 
-    file_path = VIDEO_DIR / f"{user_id}_data.json"
-    old_data = SongList(file_path)
-    videos.append_list(old_data)
-    logger.info(f"{info['name']}({user_id}) 作者歌回记录数量从 {len(old_data)} 更新到 {len(videos)} ")
-    videos.save_list(file_path)
-
-
-def create_video_list_file() -> None:
-    """获得视频列表文件(多线程)"""
+    source = user_source(user_id)
+    old_count = catalog.count(source)
+    catalog.upsert(videos.get_data(), source)
+    if items:
+        # 全部写入成功后再推进水位线，中途失败时下次会重新获取
+        newest = max(items, key=lambda item: int(item["created"]))
+        if watermark is None or int(newest["created"]) >= watermark[1]:
+            catalog.set_watermark(user_id, newest["bvid"], int(newest["created"]))
+    if items:
+        # 投稿列表中带有作者名，顺便刷新名称缓存
+        _remember_up_names({user_id: items[0]["author"]})
+        name = items[0]["author"]
+    else:
+        name = get_cached_up_names([user_id])[user_id]
+    logger.info(
+        f"{name}({user_id}) 请求 {pages} 页，新投稿 {len(items)} 个，"
+        f"作者歌回记录数量从 {old_count} 更新到 {catalog.count(source)}"
+    )
+
+
+def create_video_list_file(force_refresh: bool = False, backfill: bool = False) -> bool:
+    """获得视频列表文件(并发获取)
+
+    参数:
+        force_refresh: 为 True 时忽略扩展包视频信息缓存，全部重新获取
+        backfill: 为 True 时重新遍历 UP 主的全部投稿，而不是只同步上次以来的新投稿
+
+    返回是否全部同步成功：有 UP 主同步失败或扩展包中有视频未能获取信息时返回 False，
+    其余成功的部分照常写入。
+    """
     # UP主列表 和 爬取视频需包含词
     up_list = cfg.up_list.value
     words_set = ["合唱", "歌回", "金曲"]
-    bv_list = []
-
-    async def fetch_all():
-        await asyncio.gather(*[get_user_videos(up, words_set) for up in up_list])
-
-    # 爬取程序内建的up主近期视频
-    thread = threading.Thread(target=sync, args=(fetch_all(),))
-    thread.start()
 
     # 获取扩展包数据
     extend_data = load_extend(VIDEO_DIR)
-    if extend_data is not None:
-        bv_list.extend(extend_data["bv"])
-    song_list = SongList()
+    bv_list = extend_data["bv"] if extend_data is not None else []
 
-    for bv in bv_list:
-        song_url = f"https://www.bilibili.com/video/{bv}/"
-        song_info = resolve_url_to_info(song_url)
-        if song_info is not None:
-            song_info["url"] = song_url
-            song_info["bv"] = bv
-            song_list.append_info(song_info)
+    async def sync_up(up: int) -> bool:
+        # 单个 UP 主失败（如被限流、账号不存在）不影响其它 UP 主与扩展包
+        try:
+            await get_user_videos(up, words_set, backfill)
+        except Exception:
+            logger.opt(exception=True).warning(f"同步 UP 主 {up} 的投稿失败")
+            return False
+        return True
 
-    song_list.unique_by_bv()
-    # 将所有扩展包内视频爬取的信息写入文件
-    if song_list is not None:
-        song_list.save_list(VIDEO_DIR / "extend_video_data.json")
+    async def fetch_extend() -> SongList:
+        try:
+            return await resolve_bvs(bv_list, refresh=force_refresh)
+        except Exception:
+            logger.opt(exception=True).warning("获取扩展包视频信息失败")
+            return SongList()
 
-    thread.join()
+    async def fetch_all() -> tuple[list[bool], SongList]:
+        # 程序内建的up主近期视频与扩展包视频在同一个事件循环中并发获取
+        return await asyncio.gather(
+            asyncio.gather(*[sync_up(up) for up in up_list]),
+            fetch_extend(),
+        )
 
+    synced, song_list = run_sync(fetch_all())
 
-def get_up_name(user_id: int) -> str:
+    # 将所有扩展包内视频爬取的信息写入视频目录
+    get_catalog().upsert(song_list.get_data(), EXTEND_SOURCE)
+
+    if missing := len(set(bv_list)) - len(song_list):
+        logger.warning(f"扩展包中有 {missing} 个视频未能获取信息")
+    return all(synced) and not missing
+
+
+# UP 主名称很少变化：TTL 内直接使用缓存，过期后仍可先展示旧名称再后台刷新
+UP_NAME_TTL = 7 * 24 * 3600
+
+
+def get_up_name_cache() -> PersistentTTLCache:
+    """uid → UP 主名称 的持久化缓存"""
+    return get_persistent_cache("up_names", UP_NAME_TTL)
+
+
+def _unknown_name(user_id: int) -> str:
+    return f"Unknown({user_id})"
+
+
+def _remember_up_names(names: dict[int, str]) -> None:
     try:
-        res = sync(User(user_id, credential=get_credential()).get_user_info())
-        return res["name"]
-    except Exception:
-        logger.exception(f"获取UP主 {user_id} 名称失败")
-        return f"Unknown({user_id})"
+        get_up_name_cache().set_many({str(uid): name for uid, name in names.items()})
+    except sqlite3.Error:
+        logger.opt(exception=True).warning("写入UP主名称缓存失败")
 
 
-def get_up_names(user_ids: list[int]) -> dict[int, str]:
-    """获取多个UP主的名称"""
+def get_cached_up_names(user_ids: list[int]) -> dict[int, str]:
+    """只读缓存获取UP主名称（包括已过期的），不发起网络请求；没有缓存的返回 Unknown(uid)"""
+    cache = get_up_name_cache()
     up_names = {}
+    for user_id in user_ids:
+        try:
+            entry = cache.get_entry(str(user_id))
+        except sqlite3.Error:
+            logger.opt(exception=True).warning("读取UP主名称缓存失败")
+            entry = None
+        up_names[user_id] = entry[0] if entry is not None else _unknown_name(user_id)
+    return up_names
+
+
+async def _fetch_up_name(user_id: int) -> str:
+    user = User(user_id, credential=get_credential())
+    res = await schedule("user_info", user.get_user_info)
+    return res["name"]
+
+
+def get_up_name(user_id: int) -> str:
+    return get_up_names([user_id])[user_id]
+
+
+def get_up_names(user_ids: list[int], refresh: bool = False) -> dict[int, str]:
+    """获取多个UP主的名称，只请求缓存中没有或已过期的部分
+
+    参数:
+        refresh: 为 True 时忽略缓存，全部重新请求
+    """
+    up_names = get_cached_up_names(user_ids)
+    try:
+        fresh = set() if refresh else set(get_up_name_cache().get_many(str(uid) for uid in user_ids))
+    except sqlite3.Error:
+        logger.opt(exception=True).warning("读取UP主名称缓存失败")
+        fresh = set()
+    pending = [uid for uid in user_ids if str(uid) not in fresh]
+    if not pending:
+        return up_names
+
+    fetched: dict[int, str] = {}
 
     async def task(user_id: int):
         try:
-            res = await User(user_id, credential=get_credential()).get_user_info()
-            up_names[user_id] = res["name"]
+            fetched[user_id] = await _fetch_up_name(user_id)
         except Exception:
+            # 获取失败时保留缓存中的旧名称
             logger.exception(f"获取UP主 {user_id} 名称失败")
-            up_names[user_id] = f"Unknown({user_id})"
 
     async def fetch_all():
-        await asyncio.gather(*[task(user_id) for user_id in user_ids])
+        await asyncio.gather(*[task(user_id) for user_id in pending])
 
-    sync(fetch_all())
+    run_sync(fetch_all())
+    _remember_up_names(fetched)
+    up_names.update(fetched)
     return up_names
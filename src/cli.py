@@ -0,0 +1,266 @@
+"""无界面的命令行入口
+
+不依赖 Qt 窗口，直接调用 src.bili_api / src.core 中与界面相同的函数，适合在服务器上
+用 cron 定时执行或用于测量吞吐量。日志输出到 stderr，结果输出到 stdout（--json 时为 JSON）。
+
+    python -m src.cli crawl                       # 同步 UP 主投稿与扩展包
+    python -m src.cli crawl --every 60            # 每 60 分钟同步一次
+    python -m src.cli search 歌名 --limit 20 --json
+    python -m src.cli download BV1xx BV1yy --jobs 4
+    python -m src.cli download --file bv_list.txt --type ogg --json
+    python -m src.cli import shared/                # 导入他人分享的 *data.json
+    python -m src.cli export my_data.json           # 导出视频目录，便于分享
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from src.bili_api import create_video_list_file
+from src.bili_api.music import run_music_download_by_bvid
+from src.config import VIDEO_DIR, cfg
+from src.core.catalog import get_catalog
+from src.core.search_core import perform_search, rank_song_list
+from src.utils.text import format_timestamp
+
+BV_PATTERN = re.compile(r"^BV[0-9A-Za-z]+$", re.IGNORECASE)
+
+# 并行下载时多个线程同时输出，避免行与行交错
+_print_lock = threading.Lock()
+
+
+def _emit(args: argparse.Namespace, result: dict[str, Any], text: str) -> None:
+    line = json.dumps(result, ensure_ascii=False) if args.json else text
+    with _print_lock:
+        print(line, flush=True)
+
+
+def read_bv_file(path: Path) -> list[str]:
+    """读取 BV 列表文件：每行一个 BV，忽略空行与 # 开头的注释"""
+    bvs = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        s = line.strip()
+        if not s or s.startswith("#"):
+            continue
+        if BV_PATTERN.match(s):
+            bvs.append("BV" + s[2:])
+        else:
+            logger.debug(f"跳过无效行: {s}")
+    return bvs
+
+
+# -------- crawl --------
+def _crawl_once(args: argparse.Namespace) -> bool:
+    start = time.perf_counter()
+    ok = create_video_list_file(force_refresh=args.force_refresh, backfill=args.backfill)
+    elapsed = time.perf_counter() - start
+    total = get_catalog().count()
+    _emit(
+        args,
+        {
+            "command": "crawl",
+            "ok": ok,
+            "elapsed": round(elapsed, 3),
+            "catalog_size": total,
+            "finished_at": int(time.time()),
+        },
+        f"同步{'完成' if ok else '部分失败'}，用时 {elapsed:.1f} 秒，视频目录共 {total} 条记录",
+    )
+    return ok
+
+
+def cmd_crawl(args: argparse.Namespace) -> int:
+    if args.every is None:
+        return 0 if _crawl_once(args) else 1
+
+    # 定时同步：每轮结束后等待到下一个周期，单轮失败不影响后续
+    interval = args.every * 60
+    while True:
+        started = time.monotonic()
+        try:
+            _crawl_once(args)
+        except Exception:
+            logger.exception("同步视频目录失败")
+        time.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+# -------- import --------
+def cmd_import(args: argparse.Namespace) -> int:
+    catalog = get_catalog()
+    imported = catalog.import_json_dir(args.folder)
+    total = catalog.count()
+    _emit(
+        args,
+        {"command": "import", "folder": str(args.folder), "imported": imported, "catalog_size": total},
+        f"已导入 {imported} 条记录，视频目录共 {total} 条记录",
+    )
+    return 0
+
+
+# -------- export --------
+def cmd_export(args: argparse.Namespace) -> int:
+    try:
+        exported = get_catalog().export_json(args.path, args.source)
+    except OSError as e:
+        logger.error(f"导出失败: {e}")
+        return 1
+    _emit(
+        args,
+        {"command": "export", "path": str(args.path), "source": args.source, "exported": exported},
+        f"已导出 {exported} 条记录到 {args.path}",
+    )
+    return 0
+
+
+# -------- search --------
+def cmd_search(args: argparse.Namespace) -> int:
+    start = time.perf_counter()
+    result = perform_search(args.keyword)
+    records = rank_song_list(result, args.keyword, args.limit).get_data() if result is not None else []
+    elapsed = time.perf_counter() - start
+
+    text = "\n".join(f"{format_timestamp(r.date)}  {r.bv}  {r.author}  {r.title}" for r in records)
+    _emit(
+        args,
+        {
+            "command": "search",
+            "keyword": args.keyword,
+            "elapsed": round(elapsed, 3),
+            "count": len(records),
+            "results": [r.to_dict() for r in records],
+        },
+        text or "没有找到结果",
+    )
+    return 0 if records else 1
+
+
+# -------- download --------
+def _collect_bvs(args: argparse.Namespace) -> list[str]:
+    bvs = []
+    for bv in args.bv:
+        if BV_PATTERN.match(bv):
+            bvs.append("BV" + bv[2:])
+        else:
+            logger.warning(f"跳过无效的 BV 号: {bv}")
+    for path in args.file or []:
+        bvs.extend(read_bv_file(path))
+    return list(dict.fromkeys(bvs))
+
+
+def cmd_download(args: argparse.Namespace) -> int:
+    bvs = _collect_bvs(args)
+    if not bvs:
+        logger.error("没有需要下载的 BV 号")
+        return 2
+
+    file_type = args.type or cfg.download_type.value
+    # 只影响本次下载，不修改全局配置
+    stream = True if args.stream else None
+
+    def download(bv: str) -> dict[str, Any]:
+        start = time.perf_counter()
+        ok = run_music_download_by_bvid(bv, file_type=file_type, check_exists=not args.overwrite, stream=stream)
+        item = {"bv": bv, "ok": ok, "elapsed": round(time.perf_counter() - start, 3)}
+        _emit(args, {"command": "download", **item}, f"{'完成' if ok else '失败'}  {bv}  {item['elapsed']:.1f} 秒")
+        return item
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs, thread_name_prefix="cli-download") as pool:
+        items = list(pool.map(download, bvs))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(item["ok"] for item in items)
+    _emit(
+        args,
+        {
+            "command": "download-summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(len(items) / elapsed, 3) if elapsed else None,
+        },
+        f"共 {len(items)} 个，成功 {succeeded} 个，用时 {elapsed:.1f} 秒",
+    )
+    return 0 if succeeded == len(items) else 1
+
+
+def _positive_float(value: str) -> float:
+    """argparse 类型：大于 0 的数"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是有效的数字: {value}") from None
+    if not 0 < number < float("inf"):
+        raise argparse.ArgumentTypeError(f"必须大于 0: {value}")
+    return number
+
+
+def _positive_int(value: str) -> int:
+    """argparse 类型：大于 0 的整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不是有效的整数: {value}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须大于 0: {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="neuroSangSpider 命令行工具")
+    parser.add_argument("--json", action="store_true", help="以 JSON（每行一个对象）输出结果")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出调试日志")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl = subparsers.add_parser("crawl", help="同步 UP 主投稿与扩展包视频信息")
+    crawl.add_argument("--force-refresh", action="store_true", help="忽略扩展包视频信息缓存")
+    crawl.add_argument("--backfill", action="store_true", help="重新遍历 UP 主的全部投稿")
+    crawl.add_argument("--every", type=_positive_float, metavar="MINUTES", help="每隔指定分钟数重复同步")
+    crawl.set_defaults(func=cmd_crawl)
+
+    import_ = subparsers.add_parser("import", help="导入目录中新增或有改动的 *data.json 分享数据")
+    import_.add_argument("folder", type=Path, nargs="?", default=VIDEO_DIR, help="数据目录，默认为视频数据目录")
+    import_.set_defaults(func=cmd_import)
+
+    export = subparsers.add_parser("export", help="按分享数据格式（*data.json）导出视频目录")
+    export.add_argument("path", type=Path, help="导出文件路径")
+    export.add_argument("--source", help="只导出指定来源的记录，如 extend_video_data.json")
+    export.set_defaults(func=cmd_export)
+
+    search = subparsers.add_parser("search", help="搜索本地视频目录（并补充 bilibili 搜索结果）")
+    search.add_argument("keyword")
+    search.add_argument("--limit", type=int, default=50, help="最多输出的结果数")
+    search.set_defaults(func=cmd_search)
+
+    download = subparsers.add_parser("download", help="按 BV 号批量下载音频")
+    download.add_argument("bv", nargs="*", help="BV 号")
+    download.add_argument("-f", "--file", type=Path, action="append", help="BV 列表文件（每行一个，可重复指定）")
+    download.add_argument("-t", "--type", choices=cfg.download_type.options, help="音频格式，默认取配置")
+    download.add_argument("-j", "--jobs", type=_positive_int, default=3, help="同时下载的数量")
+    download.add_argument("--overwrite", action="store_true", help="覆盖已存在的文件")
+    download.add_argument("--stream", action="store_true", help="边下载边转码，不保存临时文件")
+    download.set_defaults(func=cmd_download)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "INFO")
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -64,17 +64,24 @@ class Config(QConfig):
     """应用程序配置类"""
 
     # 持久化配置项
+    # m4a / opus 在音频流编码相同时直接封装（-c:a copy），不重新编码
     download_type = OptionsConfigItem(
         "Download",
         "Type",
         "mp3",
-        OptionsValidator(["mp3", "ogg", "wav"]),
+        OptionsValidator(["mp3", "ogg", "wav", "m4a", "opus"]),
     )
+    # 分段下载单个媒体流时的最大并发连接数，1 表示顺序下载
+    download_connections = ConfigItem("Download", "Connections", 4)
+    # 边下载边把数据送入 ffmpeg 转码，不保存临时文件（无法跨重启续传，也不分段下载）
+    download_streaming = ConfigItem("Download", "Streaming", False)
     language = ConfigItem("Language", "Language", "zh_CN")
     volume = ConfigItem("Player", "Volume", 50)
     enable_player_bar = ConfigItem("Player", "EnablePlayerBar", True)
     play_mode = ConfigItem("Player", "Mode", PlayMode.LIST_LOOP)
     search_page = ConfigItem("Search", "PageCount", 3)
+    # bilibili 搜索结果缓存的有效期（秒），过期后先展示旧结果再在后台刷新
+    search_cache_ttl = ConfigItem("Search", "CacheTTL", 600)
     up_list = ConfigItem("Search", "UpList", _DEFAULT_UP_LIST.copy())
     black_author_list = ConfigItem("Search", "BlackList", _DEFAULT_BLACKLIST.copy())
     filter_list = ConfigItem("Search", "FilterWords", _DEFAULT_FILTER_WORDS.copy())
@@ -228,9 +235,9 @@ if CONFIG_PATH.exists():
     #         logger.info("应用主题: DARK")
 
 else:
-    logger.info("未找到配置文件，正在应用默认主题: AUTO")
-    cfg.set_theme(Theme.AUTO)
-    setTheme(QtTheme.AUTO)
+    # 只写入默认配置；主题由主窗口创建时应用，导入配置模块不触碰 Qt（命令行模式也会导入）
+    logger.info("未找到配置文件，已写入默认配置")
+    cfg.save()
 
 
 VERSION = "1.2.0"
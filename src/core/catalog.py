@@ -0,0 +1,401 @@
+"""SQLite 视频目录
+
+取代 VIDEO_DIR 下一堆 *data.json 作为视频信息的存储：
+
+- WAL 模式，bv 为主键，author / date 建有索引，date 为整数时间戳；
+- 原标题与归一化标题各建一个 FTS5（trigram）全文索引，分别用于关键词搜索
+  （search_titles 只取出命中的记录）与按文件名反查 BV；
+- 旧版的 *data.json 在升级数据库结构时一次性导入，之后的分享数据用
+  import_json_dir（命令行 import）手动导入；
+- export_json 按原 {"data": [...]} 格式导出，便于分享。
+
+每条记录的 source 记录其逻辑来源，沿用原数据文件名（如 "<uid>_data.json"）。同一视频再次写入时
+采用最新的来源，但搜索结果（SEARCH_SOURCE）只是顺带记录，不会覆盖 UP 主投稿、扩展包等更明确的来源。
+up_watermarks 记录每个 UP 主上次同步时见到的最新投稿，用于增量同步。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from src.config import VIDEO_DIR
+from src.core.data_io import catalog_cache, file_key
+from src.core.song_list import SongList, SongRecord
+from src.utils.text import normalize_title, parse_timestamp
+
+CATALOG_PATH = VIDEO_DIR / "catalog.db"
+
+SEARCH_SOURCE = "search_data.json"
+EXTEND_SOURCE = "extend_video_data.json"
+
+
+def user_source(user_id: int) -> str:
+    """UP 主投稿数据的来源名"""
+    return f"{user_id}_data.json"
+
+
+# 数据库结构版本（PRAGMA user_version）
+#   1: videos.date 由日期字符串改为整数时间戳
+#   2: 新增原标题的全文索引 videos_title_fts，并一次性导入旧版 *data.json
+SCHEMA_VERSION = 2
+
+_VIDEOS_TABLE = """
+CREATE TABLE IF NOT EXISTS videos (
+    bv TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    date INTEGER NOT NULL DEFAULT 0,
+    url TEXT NOT NULL DEFAULT '',
+    title_norm TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    extra TEXT
+)"""
+
+_VIDEOS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_videos_author ON videos(author)",
+    "CREATE INDEX IF NOT EXISTS idx_videos_date ON videos(date)",
+    "CREATE INDEX IF NOT EXISTS idx_videos_source ON videos(source)",
+)
+
+_SCHEMA = f"""
+{_VIDEOS_TABLE};
+{";".join(_VIDEOS_INDEXES)};
+CREATE TABLE IF NOT EXISTS imported_files (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS up_watermarks (
+    uid INTEGER PRIMARY KEY,
+    bv TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    synced_at INTEGER NOT NULL
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    title_norm, content='videos', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS videos_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts(rowid, title_norm) VALUES (new.rowid, new.title_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_ad AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title_norm) VALUES ('delete', old.rowid, old.title_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_au AFTER UPDATE OF title_norm ON videos BEGIN
+    INSERT INTO videos_fts(videos_fts, rowid, title_norm) VALUES ('delete', old.rowid, old.title_norm);
+    INSERT INTO videos_fts(rowid, title_norm) VALUES (new.rowid, new.title_norm);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_title_fts USING fts5(
+    title, content='videos', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS videos_title_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_title_fts(rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_title_ad AFTER DELETE ON videos BEGIN
+    INSERT INTO videos_title_fts(videos_title_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS videos_title_au AFTER UPDATE OF title ON videos BEGIN
+    INSERT INTO videos_title_fts(videos_title_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO videos_title_fts(rowid, title) VALUES (new.rowid, new.title);
+END;
+"""
+
+_RECORD_COLUMNS = "bv, title, author, date, url, extra"
+
+
+def _contains_ci(text: str | None, token: str) -> bool:
+    """标题是否包含小写分词（与 SongQuery / 搜索索引的子串匹配规则一致）"""
+    return text is not None and token in text.lower()
+
+
+def _fts_phrase(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+_UPSERT = f"""
+INSERT INTO videos (bv, title, author, date, url, title_norm, source, extra)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(bv) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    date = excluded.date,
+    url = excluded.url,
+    title_norm = excluded.title_norm,
+    source = CASE WHEN excluded.source = '{SEARCH_SOURCE}' THEN videos.source ELSE excluded.source END,
+    extra = excluded.extra
+"""
+
+
+class VideoCatalog:
+    """基于 SQLite 的视频目录
+
+    所有线程共用一个连接，由锁串行化访问：按线程各开连接时，每个结束的 QThread /
+    线程池线程都会留下一个无人关闭的连接。
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function("contains_ci", 2, _contains_ci, deterministic=True)
+        self.has_fts = False
+        # 本进程内的写入计数，与数据库文件的 mtime/大小一起作为缓存键
+        self.version = 0
+        with self._lock:
+            self._init_schema()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _init_schema(self) -> None:
+        conn = self._conn
+        with conn:
+            conn.executescript(_SCHEMA)
+        version = self._migrate(conn)
+        has_title_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'videos_title_fts'").fetchone()
+        try:
+            with conn:
+                conn.executescript(_FTS_SCHEMA)
+                if not has_title_fts:
+                    # 新建的外部内容索引需要从 videos 表补建已有记录
+                    conn.execute("INSERT INTO videos_title_fts(videos_title_fts) VALUES ('rebuild')")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或不支持 trigram 分词器时退化为逐行匹配
+            logger.warning("当前 SQLite 不支持 FTS5 trigram，标题检索将退化为全表扫描")
+        if version < 2:
+            # 一次性导入旧版分散保存的 *data.json
+            self.import_json_dir(VIDEO_DIR)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> int:
+        """升级数据库结构，返回升级前的版本"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return version
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(videos)")}
+        if columns.get("date", "").upper() != "INTEGER":
+            # SQLite 无法修改列类型：重建 videos 表，保留 rowid 使 FTS 外部内容索引依旧有效
+            logger.info("正在将视频目录中的发布时间迁移为整数时间戳")
+            conn.create_function("to_timestamp", 1, parse_timestamp, deterministic=True)
+            conn.execute("BEGIN")
+            try:
+                for name in ("idx_videos_author", "idx_videos_date", "idx_videos_source"):
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+                conn.execute("ALTER TABLE videos RENAME TO videos_old")
+                conn.execute(_VIDEOS_TABLE)
+                conn.execute(
+                    "INSERT INTO videos (rowid, bv, title, author, date, url, title_norm, source, extra) "
+                    "SELECT rowid, bv, title, author, to_timestamp(date), url, title_norm, source, extra "
+                    "FROM videos_old"
+                )
+                # 旧表上的 FTS 同步触发器随旧表一起删除，稍后重新创建
+                conn.execute("DROP TABLE videos_old")
+                for sql in _VIDEOS_INDEXES:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        else:
+            with conn:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return version
+
+    # -------- 写入 --------
+    def upsert(self, records: Iterable[Mapping[str, Any]], source: str) -> int:
+        """写入或更新记录（按 bv 去重），返回写入条数"""
+        rows = []
+        for info in records:
+            record = SongRecord.from_dict(info)
+            if not record.bv:
+                continue
+            extra = json.dumps(record.extra, ensure_ascii=False) if record.extra else None
+            rows.append(
+                (
+                    record.bv,
+                    str(record.title),
+                    str(record.author),
+                    parse_timestamp(record.date),
+                    str(record.url),
+                    normalize_title(str(record.title)),
+                    source,
+                    extra,
+                )
+            )
+        if not rows:
+            return 0
+        with self._lock, self._conn as conn:
+            conn.executemany(_UPSERT, rows)
+            self.version += 1
+        return len(rows)
+
+    def set_watermark(self, user_id: int, bv: str, created: int) -> None:
+        """记录 UP 主已同步到的最新投稿"""
+        with self._lock, self._conn as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO up_watermarks (uid, bv, created, synced_at) VALUES (?, ?, ?, ?)",
+                (user_id, bv, created, int(time.time())),
+            )
+
+    # -------- 读取 --------
+    @staticmethod
+    def _to_record(row: tuple) -> SongRecord:
+        bv, title, author, date, url, extra = row
+        return SongRecord(
+            title=title,
+            author=author,
+            date=date,
+            url=url,
+            bv=bv,
+            extra=json.loads(extra) if extra else None,
+        )
+
+    def cache_key(self) -> tuple:
+        """当前数据版本：进程内写入计数 + 数据库及 WAL 文件的 (路径, mtime, 大小)"""
+        wal = self.path.with_name(self.path.name + "-wal")
+        return self.version, file_key(self.path), file_key(wal)
+
+    def load_all(self, source: str | None = None) -> SongList:
+        """按写入顺序读取全部（或指定来源的）记录"""
+        sql = f"SELECT {_RECORD_COLUMNS} FROM videos"
+        params: tuple = ()
+        if source is not None:
+            sql += " WHERE source = ?"
+            params = (source,)
+        sql += " ORDER BY rowid"
+        song_list = SongList()
+        song_list.extend(self._to_record(row) for row in self._query(sql, params))
+        return song_list
+
+    def _title_filter(self, tokens: Iterable[str]) -> tuple[str, list[str]]:
+        """标题包含全部分词（不区分大小写的子串）的 WHERE 子句与参数，没有分词时为空
+
+        三字及以上的分词先经 FTS5 缩小候选集，再对候选逐一校验。
+        """
+        tokens = [token.lower() for token in tokens if token]
+        conditions: list[str] = []
+        params: list[str] = []
+        if self.has_fts and (long_tokens := [token for token in tokens if len(token) >= 3]):
+            conditions.append("rowid IN (SELECT rowid FROM videos_title_fts WHERE videos_title_fts MATCH ?)")
+            params.append(" AND ".join(_fts_phrase(token) for token in long_tokens))
+        for token in tokens:
+            conditions.append("contains_ci(title, ?)")
+            params.append(token)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def search_titles(self, tokens: Iterable[str]) -> SongList:
+        """按写入顺序返回标题包含全部分词（不区分大小写的子串）的记录，只读出命中的行"""
+        where, params = self._title_filter(tokens)
+        sql = f"SELECT {_RECORD_COLUMNS} FROM videos{where} ORDER BY rowid"
+        song_list = SongList()
+        song_list.extend(self._to_record(row) for row in self._query(sql, params))
+        return song_list
+
+    def title_doc_freq(self, token: str) -> int:
+        """标题包含 token 的记录数（BM25 的文档频率）"""
+        where, params = self._title_filter([token])
+        return self._query(f"SELECT COUNT(*) FROM videos{where}", params)[0][0]
+
+    def avg_title_length(self) -> float:
+        """全部记录的平均标题长度（BM25 的平均文档长度）"""
+        return self._query("SELECT AVG(length(title)) FROM videos")[0][0] or 0.0
+
+    def count(self, source: str | None = None) -> int:
+        if source is None:
+            return self._query("SELECT COUNT(*) FROM videos")[0][0]
+        return self._query("SELECT COUNT(*) FROM videos WHERE source = ?", (source,))[0][0]
+
+    def get_watermark(self, user_id: int) -> tuple[str, int] | None:
+        """返回 UP 主上次同步到的最新投稿 (bv, 发布时间戳)，从未同步过时返回 None"""
+        rows = self._query("SELECT bv, created FROM up_watermarks WHERE uid = ?", (user_id,))
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    def match_title_candidates(self, text_norm: str) -> list[tuple[str, str]]:
+        """返回归一化标题与 text_norm 共享任一三字片段的 (bv, title)
+
+        只作为候选集，调用方需自行校验。文本过短或不支持 FTS 时返回全部记录。
+        """
+        grams = {text_norm[i : i + 3] for i in range(len(text_norm) - 2)}
+        if not self.has_fts or not grams:
+            return self._query("SELECT bv, title FROM videos ORDER BY rowid")
+        query = " OR ".join(f'"{gram}"' for gram in grams)
+        return self._query(
+            "SELECT v.bv, v.title FROM videos_fts f JOIN videos v ON v.rowid = f.rowid "
+            "WHERE videos_fts MATCH ? ORDER BY v.rowid",
+            (query,),
+        )
+
+    # -------- 导入 / 导出 --------
+    def import_json_dir(self, folder: Path = VIDEO_DIR) -> int:
+        """导入目录下新增或有改动的 *data.json，返回导入的记录数"""
+        known = {
+            name: (mtime_ns, size)
+            for name, mtime_ns, size in self._query("SELECT name, mtime_ns, size FROM imported_files")
+        }
+        imported = 0
+        for fp in sorted(folder.glob("*data.json")):
+            try:
+                st = fp.stat()
+                if known.get(fp.name) == (st.st_mtime_ns, st.st_size):
+                    continue
+                song_list = SongList(fp)
+                count = self.upsert(song_list.get_data(), source=fp.name)
+                with self._lock, self._conn as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO imported_files (name, mtime_ns, size) VALUES (?, ?, ?)",
+                        (fp.name, st.st_mtime_ns, st.st_size),
+                    )
+                logger.info(f"已导入 {fp.name} 中的 {count} 条视频记录")
+                imported += count
+            except (OSError, sqlite3.Error):
+                # 文件内容损坏时 SongList 已记录并得到空列表，这里只处理读写失败
+                logger.exception(f"导入文件 {fp} 时出错")
+        return imported
+
+    def export_json(self, path: Path, source: str | None = None) -> int:
+        """按 {"data": [...]} 格式导出全部（或指定来源的）记录，返回导出条数
+
+        与 SongList.save_list 不同，写入失败时抛出 OSError，不会被当作导出成功。
+        """
+        records = [record.to_dict() for record in self.load_all(source)]
+        path.write_text(json.dumps({"data": records}, ensure_ascii=False, indent=2), encoding="utf-8")
+        return len(records)
+
+
+_catalog: VideoCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> VideoCatalog:
+    """获取进程内共享的视频目录（首次打开旧版数据时导入已有 JSON 数据）"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = VideoCatalog(CATALOG_PATH)
+        return _catalog
+
+
+def load_catalog() -> SongList:
+    """读取完整视频目录的只读视图（用于需要遍历全部记录的模糊索引）
+
+    数据未变化时直接返回进程内缓存，不再重复查询数据库。关键词搜索请用 search_titles。
+    """
+    catalog = get_catalog()
+    return catalog_cache.snapshot("catalog", catalog.cache_key(), catalog.load_all)
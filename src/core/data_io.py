@@ -1,27 +1,55 @@
 import json
+import threading
+from collections.abc import Callable, Hashable
 from pathlib import Path
+
 from loguru import logger
+
 from src.core.song_list import SongList
 
 
-def load_from_all_data(input_folder: Path, exclude_file: list[str] | None = None):
-    """读取所有的data.json文件,并在去重后返回"""
-    if exclude_file is None:
-        exclude_file = []
+FileKey = tuple[str, int, int]
 
-    total_list = SongList()
 
-    for fp in input_folder.iterdir():
-        # 跳过非data.json和已排除的文件
-        if not fp.name.endswith("data.json") or fp.name in exclude_file:
-            continue
-        try:
-            total_list.append_list(SongList(fp))
-        except Exception:
-            logger.exception(f"处理文件 {fp} 时出错")
-            return None
-    total_list.unique_by_bv()
-    return total_list
+def file_key(path: Path) -> FileKey | None:
+    """文件的 (路径, mtime, 大小)，文件不存在时返回 None"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return str(path), st.st_mtime_ns, st.st_size
+
+
+class CatalogCache:
+    """进程内共享的视频目录快照缓存
+
+    - 快照按调用方给出的数据版本键缓存，命中时直接返回只读视图；
+    - 快照的记录保存在不可变的元组中，视图之间共享而不复制。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, tuple[Hashable, SongList]] = {}
+
+    def snapshot(self, name: str, key: Hashable, loader: Callable[[], SongList]) -> SongList:
+        """按 key 缓存 loader 的结果，返回只读视图"""
+        with self._lock:
+            cached = self._snapshots.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1].readonly_view()
+
+        logger.debug(f"视频目录缓存未命中: {name}")
+        song_list = loader().readonly_view()
+        with self._lock:
+            self._snapshots[name] = (key, song_list)
+        return song_list.readonly_view()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+catalog_cache = CatalogCache()
 
 
 def load_extend(input_folder: Path):
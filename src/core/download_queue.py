@@ -1,19 +1,30 @@
 """下载队列管理器
 
 支持多个音频同时下载,管理下载任务队列。
+
+所有下载在共享异步运行时（src.utils.runtime）的事件循环中并发执行，并发数由信号量限制。
+调度协程在 start() 后常驻：队列空闲时等待新任务，而不是退出后再重新创建。
 """
 
+import asyncio
+from concurrent.futures import CancelledError as FutureCancelledError
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
 from enum import Enum
+from functools import partial
 from pathlib import Path
-from queue import Queue
-from threading import Lock, Thread, current_thread
+from threading import Lock
 
 from loguru import logger
 from PyQt6.QtCore import QObject, pyqtSignal
 
-from src.bili_api import run_music_download
+from src.bili_api import download_song
 from src.core.song_list import SongList
+from src.utils.runtime import get_runtime, submit
+
+# stop() 等待正在进行的下载取消完成的最长时间（秒）
+STOP_TIMEOUT = 1.0
 
 
 class DownloadStatus(Enum):
@@ -42,7 +53,7 @@ class DownloadTask:
 class DownloadQueueManager(QObject):
     """下载队列管理器"""
 
-    # 信号定义
+    # 信号定义（在事件循环线程中发出，Qt 会排队到接收者所在的线程）
     task_added = pyqtSignal(DownloadTask)  # 任务添加
     task_started = pyqtSignal(DownloadTask)  # 任务开始
     task_completed = pyqtSignal(DownloadTask)  # 任务完成
@@ -57,14 +68,16 @@ class DownloadQueueManager(QObject):
         """
         super().__init__()
         self.max_workers = max_workers
-        self.task_queue: Queue[DownloadTask] = Queue()
         self.active_tasks: list[DownloadTask] = []
         self.completed_tasks: list[DownloadTask] = []
         self.failed_tasks: list[DownloadTask] = []
         self.lock = Lock()
         self.is_running = False
-        self.worker_threads: list[Thread] = []
-        self.pending_tasks: list[DownloadTask] = []  # 存储等待中的任务，用于去重和展示
+        self.pending_tasks: list[DownloadTask] = []  # 等待中的任务（按添加顺序下载），也用于去重和展示
+        # 以下对象只在事件循环线程中使用
+        self._dispatcher: Future | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._transfers: set[asyncio.Task] = set()
 
     def add_task(self, task: DownloadTask) -> bool:
         """添加下载任务到队列
@@ -81,11 +94,14 @@ class DownloadQueueManager(QObject):
                 logger.warning(f"任务已存在，跳过: {task.title} ({task.bvid})")
                 return False
 
-            self.task_queue.put(task)
             self.pending_tasks.append(task)
             logger.info(f"添加下载任务到队列: {task.title} ({task.bvid})")
             self.task_added.emit(task)
-            return True
+            # 队列已启动时立即开始调度新任务
+            if self._dispatcher is not None:
+                self.is_running = True
+        self._notify()
+        return True
 
     def _is_task_exists(self, bvid: str) -> bool:
         """检查任务是否已存在（包括等待、下载中、已完成、失败）
@@ -120,90 +136,114 @@ class DownloadQueueManager(QObject):
             logger.warning("下载队列已在运行中")
             return
 
-        self.is_running = True
         logger.info(f"启动下载队列，最大并发数: {self.max_workers}")
-
-        # 启动工作线程
-        for i in range(self.max_workers):
-            thread = Thread(target=self._worker, name=f"DownloadWorker-{i}", daemon=True)
-            thread.start()
-            self.worker_threads.append(thread)
+        with self.lock:
+            self.is_running = bool(self.pending_tasks or self.active_tasks)
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = submit(self._dispatch())
+        self._notify()
 
     def stop(self) -> None:
-        """停止下载队列"""
+        """停止下载队列，取消正在进行的下载"""
         logger.info("停止下载队列")
-        self.is_running = False
-
-        # 等待所有工作线程结束
-        for thread in self.worker_threads:
-            if thread.is_alive():
-                thread.join(timeout=1)
-
-        self.worker_threads.clear()
-
-    def _worker(self) -> None:
-        """工作线程函数"""
-        while self.is_running:
-            try:
-                # 从队列获取任务，超时1秒
-                task = self.task_queue.get(timeout=1)
-
-                with self.lock:
-                    # 从等待列表移除
-                    if task in self.pending_tasks:
-                        self.pending_tasks.remove(task)
-                    task.status = DownloadStatus.DOWNLOADING
-                    self.active_tasks.append(task)
-
-                logger.info(f"开始下载: {task.title} ({task.bvid})")
-                self.task_started.emit(task)
-
-                # 执行下载
-                try:
-                    success = run_music_download(task.index, task.search_list, task.file_type)
-
-                    with self.lock:
-                        if task in self.active_tasks:
-                            self.active_tasks.remove(task)
-
-                        if success:
-                            task.status = DownloadStatus.SUCCESS
-                            self.completed_tasks.append(task)
-                            logger.success(f"下载完成: {task.title}")
-                            self.task_completed.emit(task)
-                        else:
-                            task.status = DownloadStatus.FAILED
-                            task.error_msg = "下载失败"
-                            self.failed_tasks.append(task)
-                            logger.error(f"下载失败: {task.title}")
-                            self.task_failed.emit(task)
-
-                except Exception as e:
-                    logger.exception(f"下载任务异常: {task.title}")
-                    with self.lock:
-                        if task in self.active_tasks:
-                            self.active_tasks.remove(task)
-                        task.status = DownloadStatus.FAILED
-                        task.error_msg = str(e)
-                        self.failed_tasks.append(task)
-                        self.task_failed.emit(task)
-
-                finally:
-                    self.task_queue.task_done()
-
-            except Exception:
-                # 队列超时，检查是否需要退出
-                with self.lock:
-                    # 如果队列空且没有活动任务，退出线程
-                    if self.task_queue.empty() and not self.active_tasks:
-                        break
-                continue
-
-        # 工作线程结束，最后一个线程发送完成信号
         with self.lock:
-            # 检查是否是最后一个活动线程
-            alive_workers = sum(1 for t in self.worker_threads if t.is_alive() and t != current_thread())
-            if alive_workers == 0 and self.task_queue.empty() and not self.active_tasks:
+            self.is_running = False
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is None:
+            return
+        dispatcher.cancel()
+        try:
+            submit(self._cancel_transfers()).result(STOP_TIMEOUT)
+        except FutureTimeoutError:
+            logger.warning("部分下载未能及时取消")
+        except (FutureCancelledError, RuntimeError):
+            logger.opt(exception=True).warning("停止下载队列时出错")
+
+    def _notify(self) -> None:
+        """唤醒调度协程（可在任意线程调用）"""
+        if self._dispatcher is not None:
+            get_runtime().loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _take_pending(self) -> DownloadTask | None:
+        with self.lock:
+            if not self.pending_tasks:
+                return None
+            task = self.pending_tasks.pop(0)
+            task.status = DownloadStatus.DOWNLOADING
+            self.active_tasks.append(task)
+            return task
+
+    async def _dispatch(self) -> None:
+        """常驻的调度协程：有空闲名额且有等待的任务时开始下载，否则等待唤醒"""
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        try:
+            while True:
+                await semaphore.acquire()
+                while (task := self._take_pending()) is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                transfer = asyncio.create_task(self._run_task(task))
+                self._transfers.add(transfer)
+                # 名额与结果在回调中处理：任务在协程开始执行前就被取消时，协程内的 finally 不会运行
+                transfer.add_done_callback(partial(self._transfer_done, task, semaphore))
+        finally:
+            self._wakeup = None
+
+    async def _cancel_transfers(self) -> None:
+        transfers = list(self._transfers)
+        for transfer in transfers:
+            transfer.cancel()
+        await asyncio.gather(*transfers, return_exceptions=True)
+
+    async def _run_task(self, task: DownloadTask) -> tuple[bool, str]:
+        """执行单个下载任务，返回 (是否成功, 错误信息)"""
+        logger.info(f"开始下载: {task.title} ({task.bvid})")
+        self.task_started.emit(task)
+        try:
+            success = await download_song(task.index, task.search_list, task.file_type)
+        except Exception as e:
+            # 下载中可能出现任意异常，单个任务失败不影响队列
+            logger.exception(f"下载任务异常: {task.title}")
+            return False, str(e)
+        return success, "" if success else "下载失败"
+
+    def _transfer_done(self, task: DownloadTask, semaphore: asyncio.Semaphore, transfer: asyncio.Task) -> None:
+        """下载协程结束（包括还没开始就被取消）后释放名额并记录结果"""
+        self._transfers.discard(transfer)
+        semaphore.release()
+        if transfer.cancelled():
+            logger.info(f"下载已取消: {task.title}")
+            success, error_msg = False, "已取消"
+        elif (exc := transfer.exception()) is not None:
+            success, error_msg = False, str(exc)
+        else:
+            success, error_msg = transfer.result()
+        self._finish_task(task, success, error_msg)
+
+    def _finish_task(self, task: DownloadTask, success: bool, error_msg: str) -> None:
+        with self.lock:
+            if task in self.active_tasks:
+                self.active_tasks.remove(task)
+
+            if success:
+                task.status = DownloadStatus.SUCCESS
+                self.completed_tasks.append(task)
+                logger.success(f"下载完成: {task.title}")
+                self.task_completed.emit(task)
+            else:
+                task.status = DownloadStatus.FAILED
+                task.error_msg = error_msg
+                self.failed_tasks.append(task)
+                logger.error(f"下载失败: {task.title}")
+                self.task_failed.emit(task)
+
+            # 队列清空后发送完成信号；调度协程保持运行，之后添加的任务会直接开始下载
+            if self.is_running and not self.pending_tasks and not self.active_tasks:
                 logger.info("所有下载任务已完成")
                 self.is_running = False
                 self.queue_completed.emit()
@@ -217,12 +257,12 @@ class DownloadQueueManager(QObject):
         with self.lock:
             return {
                 "is_running": self.is_running,
-                "pending": self.task_queue.qsize(),
+                "pending": len(self.pending_tasks),
                 "active": len(self.active_tasks),
                 "completed": len(self.completed_tasks),
                 "failed": len(self.failed_tasks),
                 "total": (
-                    self.task_queue.qsize()
+                    len(self.pending_tasks)
                     + len(self.active_tasks)
                     + len(self.completed_tasks)
                     + len(self.failed_tasks)
@@ -249,12 +289,6 @@ class DownloadQueueManager(QObject):
         with self.lock:
             # 清空等待队列
             pending_count = len(self.pending_tasks)
-            while not self.task_queue.empty():
-                try:
-                    self.task_queue.get_nowait()
-                    self.task_queue.task_done()
-                except Exception:
-                    break
             self.pending_tasks.clear()
 
             # 清空已完成和失败
@@ -293,4 +327,5 @@ class DownloadQueueManager(QObject):
 
     def get_pending_count(self) -> int:
         """获取等待中的任务数量"""
-        return self.task_queue.qsize()
+        with self.lock:
+            return len(self.pending_tasks)
@@ -0,0 +1,137 @@
+"""容错 / 拼音模糊搜索索引
+
+标题按「英文数字串」与「连续汉字串」切分，每个词加首尾标记后取三字片段（trigram）
+建立倒排表；汉字串额外加入其拼音（如「歌回」→ gehui），因此可以用拼音、
+带错别字或少打字母的关键词在本地命中，而不必回退到网络搜索。
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable, Sequence
+
+from loguru import logger
+from pypinyin import lazy_pinyin
+
+from src.core.song_list import SongList, SongRecord
+
+_TOKEN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+_CJK = re.compile(r"[\u4e00-\u9fff]")
+
+
+def _tokens(text: str) -> list[str]:
+    """NFKC 规范化并小写后切分为英文数字串与汉字串"""
+    return _TOKEN.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def _pinyin(token: str) -> str | None:
+    if not _CJK.match(token):
+        return None
+    return "".join(lazy_pinyin(token))
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"^{token}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def title_grams(title: str) -> set[str]:
+    """标题（含汉字拼音）的三字片段集合"""
+    grams: set[str] = set()
+    for token in _tokens(title):
+        grams |= _trigrams(token)
+        if py := _pinyin(token):
+            grams |= _trigrams(py)
+    return grams
+
+
+def query_grams(query: str) -> set[str]:
+    grams: set[str] = set()
+    for token in _tokens(query):
+        grams |= _trigrams(token)
+    return grams
+
+
+class FuzzyIndex:
+    """三字片段倒排索引，按查询片段的覆盖率给出近似匹配"""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._ids: dict[str, int] = {}
+        self._bvs: list[str] = []
+        self._titles: list[str] = []
+        self._grams: list[frozenset[str]] = []
+        self._postings: dict[str, set[int]] = {}
+        self._synced_records: Sequence[SongRecord] | None = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, record: SongRecord) -> bool:
+        bv, title = record.bv, str(record.title)
+        if not bv:
+            return False
+        with self._lock:
+            doc_id = self._ids.get(bv)
+            if doc_id is not None and self._titles[doc_id] == title:
+                return False
+            grams = frozenset(title_grams(title))
+            if doc_id is None:
+                doc_id = len(self._bvs)
+                self._ids[bv] = doc_id
+                self._bvs.append(bv)
+                self._titles.append(title)
+                self._grams.append(grams)
+            else:
+                for gram in self._grams[doc_id] - grams:
+                    self._postings[gram].discard(doc_id)
+                self._titles[doc_id] = title
+                self._grams[doc_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(doc_id)
+            return True
+
+    def add_list(self, records: Iterable[SongRecord]) -> int:
+        with self._lock:
+            return sum(self.add(record) for record in records)
+
+    def sync(self, slist: SongList) -> int:
+        """增量索引列表中新增或标题有变化的记录"""
+        records = slist.get_data()
+        if records is self._synced_records:
+            return 0
+        changed = self.add_list(records)
+        self._synced_records = records
+        if changed:
+            logger.info(f"模糊搜索索引更新 {changed} 条记录")
+        return changed
+
+    def search(self, query: str, threshold: float = 0.5, limit: int = 200) -> list[tuple[str, float]]:
+        """返回 (bv, 得分) 列表，得分为查询片段在标题中出现的比例，按得分从高到低排序"""
+        grams = query_grams(query)
+        if not grams:
+            return []
+        with self._lock:
+            counter: Counter[int] = Counter()
+            for gram in grams:
+                if ids := self._postings.get(gram):
+                    counter.update(ids)
+            total = len(grams)
+            need = threshold * total
+            scored = [(count / total, -doc_id) for doc_id, count in counter.items() if count >= need]
+            scored.sort(reverse=True)
+            return [(self._bvs[-neg_id], score) for score, neg_id in scored[:limit]]
+
+
+_fuzzy_index: FuzzyIndex | None = None
+_fuzzy_index_lock = threading.Lock()
+
+
+def get_fuzzy_index() -> FuzzyIndex:
+    """获取进程内共享的模糊搜索索引"""
+    global _fuzzy_index
+    with _fuzzy_index_lock:
+        if _fuzzy_index is None:
+            _fuzzy_index = FuzzyIndex()
+        return _fuzzy_index
@@ -0,0 +1,140 @@
+"""搜索结果排序（BM25 + 发布时间加成）
+
+每条记录的小写标题 / 作者、标题长度与发布时间戳在首次加入时计算并缓存，
+文档频率与平均标题长度经视频目录的全文索引查询，并缓存到目录下次变化为止。
+排序时只对查询分词做一次预处理，再用堆取出前 k 条，不必对整个结果列表排序。
+"""
+
+import heapq
+import math
+import threading
+import time
+from collections.abc import Callable
+from typing import NamedTuple
+
+from src.core.catalog import VideoCatalog, get_catalog
+from src.core.song_list import SongList, SongRecord
+from src.utils.text import parse_timestamp, split_query
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 发布时间加成：最新发布的视频最多加 RECENCY_WEIGHT 分，每过半衰期减半
+RECENCY_WEIGHT = 1.0
+RECENCY_HALF_LIFE = 180 * 24 * 3600
+# 完整查询短语出现在标题中 / 标题以首个分词开头 / 分词命中作者 时的加分
+PHRASE_BONUS = 3.0
+PREFIX_BONUS = 1.0
+AUTHOR_BONUS = 0.3
+
+
+class _Features(NamedTuple):
+    title: str  # 原标题，用于判断缓存是否过期
+    title_lc: str
+    author_lc: str
+    length: int
+    timestamp: int
+
+
+class RankingEngine:
+    """按查询为结果列表打分并取前 k 条"""
+
+    def __init__(self, catalog: VideoCatalog | None = None) -> None:
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self._features: dict[str, _Features] = {}
+        # 词项统计，视频目录的 cache_key 变化时清空
+        self._stats_key: tuple | None = None
+        self._total = 0
+        self._avgdl = 0.0
+        self._df: dict[str, int] = {}
+
+    @property
+    def catalog(self) -> VideoCatalog:
+        return self._catalog or get_catalog()
+
+    def features(self, record: SongRecord) -> _Features:
+        """取记录的归一化字段；首次出现或标题有变化时重新计算"""
+        title = str(record.title)
+        feats = self._features.get(record.bv)
+        if feats is None or feats.title != title:
+            title_lc = title.lower()
+            feats = _Features(title, title_lc, str(record.author).lower(), len(title_lc), parse_timestamp(record.date))
+            if record.bv:
+                with self._lock:
+                    self._features[record.bv] = feats
+        return feats
+
+    def _term_stats(self, tokens: list[str]) -> tuple[dict[str, float], float]:
+        """返回 (各分词的 idf, 平均标题长度)"""
+        catalog = self.catalog
+        key = catalog.cache_key()
+        with self._lock:
+            if key != self._stats_key:
+                self._stats_key = key
+                self._total = catalog.count()
+                self._avgdl = catalog.avg_title_length()
+                self._df.clear()
+            total = max(self._total, 1)
+            idf = {}
+            for token in tokens:
+                if (df := self._df.get(token)) is None:
+                    df = self._df[token] = catalog.title_doc_freq(token)
+                idf[token] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            return idf, self._avgdl
+
+    def score_key(self, query: str) -> Callable[[SongRecord], float]:
+        """返回给定查询下的打分函数（分数越高越相关）；空查询只按发布时间打分"""
+        q = (query or "").strip().lower()
+        tokens = list(dict.fromkeys(split_query(q)))
+        if not tokens:
+            return lambda record: self.features(record).timestamp
+
+        idf, avgdl = self._term_stats(tokens)
+        avgdl = avgdl or 1.0
+        now = time.time()
+
+        def key(record: SongRecord) -> float:
+            feats = self.features(record)
+            norm = K1 * (1 - B + B * feats.length / avgdl)
+            score = 0.0
+            for token in tokens:
+                if tf := feats.title_lc.count(token):
+                    score += idf[token] * tf * (K1 + 1) / (tf + norm)
+                if token in feats.author_lc:
+                    score += AUTHOR_BONUS
+            if len(tokens) > 1 and q in feats.title_lc:
+                score += PHRASE_BONUS
+            if feats.title_lc.startswith(tokens[0]):
+                score += PREFIX_BONUS
+            if feats.timestamp > 0:
+                age = max(now - feats.timestamp, 0.0)
+                score += RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+            return score
+
+        return key
+
+    def top_k(self, slist: SongList, query: str, k: int | None = None) -> SongList:
+        """返回按 BM25 + 时间加成从高到低排列的前 k 条（k 为 None 时返回全部）"""
+        records = slist.get_data()
+        key = self.score_key(query)
+        if k is None or k >= len(records):
+            ranked = sorted(records, key=key, reverse=True)
+        else:
+            ranked = heapq.nlargest(k, records, key=key)
+        result = SongList()
+        result.extend(ranked)
+        return result
+
+
+_ranking_engine: RankingEngine | None = None
+_ranking_engine_lock = threading.Lock()
+
+
+def get_ranking_engine() -> RankingEngine:
+    """获取进程内共享的排序引擎"""
+    global _ranking_engine
+    with _ranking_engine_lock:
+        if _ranking_engine is None:
+            _ranking_engine = RankingEngine()
+        return _ranking_engine
@@ -1,135 +1,121 @@
 from __future__ import annotations
 
-from datetime import datetime
+from collections.abc import Callable, Generator
 
-from bilibili_api import sync
 from loguru import logger
 
 from src.bili_api import search_on_bilibili, search_song_list
+from src.bili_api.music import fuzzy_search_song_list
+from src.core.ranking import get_ranking_engine
 from src.core.song_list import SongList
-from src.utils.text import format_date_str
+from src.utils.runtime import run_sync
 
-
-def parse_date(dt_str: str) -> datetime:
-    """尽力解析日期字符串为 datetime，用于排序。失败返回最小时间。"""
-    try:
-        if not dt_str:
-            return datetime.min
-        # 尝试完整时间戳格式
-        if " " in dt_str:
-            return datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-        # 退化为仅日期，先规范化显示格式再解析
-        norm = format_date_str(dt_str)
-        return datetime.strptime(norm, "%Y-%m-%d")
-    except Exception:
-        return datetime.min
+# 本地模糊匹配的最高近似度达到该值时认为结果足够可靠，不再进行网络搜索
+STRONG_FUZZY_SCORE = 0.8
 
 
 def sort_song_list_by_date_desc(slist: SongList) -> None:
-    """将 SongList 按 date 从新到旧排序（原地）。"""
+    """将 SongList 按发布时间戳从新到旧排序（原地）。"""
     try:
-        data = slist.get_data()
-        data.sort(key=lambda x: parse_date(str(x.get("date", ""))), reverse=True)
+        slist.sort(key=lambda record: record.date, reverse=True)
     except Exception:
         logger.exception("排序列表时出错")
 
 
-def compute_relevance(item: dict, query: str) -> float:
-    """基于标题与作者的简单相关性评分。"""
+def sort_song_list_by_relevance(slist: SongList, query: str) -> None:
+    """按相关度（BM25 + 发布时间加成）原地排序；空查询则退化为日期倒序。"""
     try:
-        q = (query or "").strip().lower()
-        if not q:
-            return 0.0
-        tokens = [tok for tok in q.split() if tok]
-        title = str(item.get("title", "")).lower()
-        author = str(item.get("author", "")).lower()
-
-        score = 0.0
-        # 短语匹配加权
-        if q in title:
-            score += 5.0
-        # 首词前缀
-        if tokens and title.startswith(tokens[0]):
-            score += 2.0
-        # 逐词匹配
-        for tok in tokens:
-            if tok in title:
-                score += 1.0
-                # 多次出现的轻微加成
-                occ = title.count(tok)
-                if occ > 1:
-                    score += min(occ - 1, 3) * 0.3
-            if tok in author:
-                score += 0.3
-
-        # 轻微长度规范化（更短标题略占优）
-        tl = len(title)
-        if tl > 0:
-            score += max(0.0, 1.5 - tl / 80.0)
-
-        return score
+        slist.sort(key=get_ranking_engine().score_key(query), reverse=True)
     except Exception:
-        logger.exception("计算相关度失败")
-        return 0.0
+        logger.exception("相关度排序失败，退化为日期排序")
+        sort_song_list_by_date_desc(slist)
 
 
-def sort_song_list_by_relevance(slist: SongList, query: str) -> None:
-    """按相关度排序；空查询则退化为日期倒序。"""
-    q = (query or "").strip()
+def rank_song_list(slist: SongList, query: str, limit: int | None = None) -> SongList:
+    """按相关度返回前 limit 条结果（新列表，原列表不变），用堆选取而不必整体排序。"""
     try:
-        data = slist.get_data()
-        if not q:
-            data.sort(key=lambda x: parse_date(str(x.get("date", ""))), reverse=True)
-            return
-        data.sort(
-            key=lambda x: (
-                compute_relevance(x, q),
-                parse_date(str(x.get("date", ""))),
-            ),
-            reverse=True,
-        )
+        return get_ranking_engine().top_k(slist, query, limit)
     except Exception:
         logger.exception("相关度排序失败，退化为日期排序")
-        sort_song_list_by_date_desc(slist)
+        result = SongList()
+        result.extend(slist.get_data())
+        sort_song_list_by_date_desc(result)
+        return result
 
 
-def perform_search(search_content: str) -> SongList | None:
-    """执行搜索：先查本地，必要时或增量用 bilibili 搜索补充。
+def iter_search(search_content: str, is_cancelled: Callable[[], bool] | None = None) -> Generator[SongList]:
+    """流式执行搜索：先产出本地结果，再产出合并 bilibili 增量后的结果。
 
-    - 返回 SongList 或 None（未找到或出错）。
-    - 不做任何 UI 交互，仅记录日志。
+    - 每次产出的都是截至当前的完整结果（而非差量），调用方直接替换展示即可。
+    - 产出的列表此后不会再被修改，调用方可以在其它线程中读取。
+    - 未找到任何结果时不产出。
+    - 本地模糊匹配的结果足够可靠时（见 STRONG_FUZZY_SCORE）不进行网络搜索。
+    - is_cancelled 返回 True 时（如发起了新的查询）不再进行网络搜索，也不再写入视频目录。
     """
+    cancelled = is_cancelled or (lambda: False)
+
+    # 获取本地数据
+    main_search_list = search_song_list(search_content)
+    if main_search_list is not None:
+        logger.info(f"本地获取 {len(main_search_list.get_data())} 个有效视频数据:")
+        logger.info(main_search_list.get_data())
+        yield main_search_list
+    else:
+        # 精确匹配无结果时先给出本地容错 / 拼音匹配结果，网络搜索只作为补充
+        main_search_list, best_score = fuzzy_search_song_list(search_content)
+        if main_search_list is not None:
+            logger.info(f"本地模糊匹配到 {len(main_search_list.get_data())} 个视频数据")
+            yield main_search_list
+            if best_score >= STRONG_FUZZY_SCORE:
+                logger.info(f"本地模糊匹配近似度 {best_score:.2f}，跳过 bilibili 搜索")
+                return
+        else:
+            logger.info("没有在本地列表找到该歌曲，正在尝试 bilibili 搜索")
+
+    if cancelled():
+        return
+
+    # 使用 bilibili 搜索补充增量
     try:
-        # 获取本地数据
-        main_search_list = search_song_list(search_content)
+        run_sync(search_on_bilibili(search_content, cancelled))
+    except Exception:
+        logger.exception("bilibili 搜索失败")
+        return
+
+    if cancelled():
+        return
+
+    more_search_list = search_song_list(search_content)
+    if more_search_list is None:
         if main_search_list is None:
-            # 本地查找失败时，尝试使用 bilibili 搜索
-            logger.info("没有在本地列表找到该歌曲，正在尝试 bilibili 搜索")
-            try:
-                sync(search_on_bilibili(search_content))
-                main_search_list = search_song_list(search_content)
-            except Exception:
-                logger.exception("bilibili 搜索失败")
-            else:
-                if main_search_list is None:
-                    logger.warning("bilibili 搜索结果为空")
+            logger.warning("bilibili 搜索结果为空")
+        return
 
-        else:
-            logger.info(f"本地获取 {len(main_search_list.get_data())} 个有效视频数据:")
-            logger.info(main_search_list.get_data())
+    if main_search_list is None:
+        yield more_search_list
+        return
+
+    delta = len(more_search_list.get_data()) - len(main_search_list.get_data())
+    logger.info(f"bilibili 获取增量 {delta} 个有效视频数据:")
+    # 已产出的列表可能正在被 UI 线程读取，合并到新列表而不是原地追加
+    merged = SongList()
+    merged.append_list(main_search_list)
+    merged.append_list(more_search_list)
+    yield merged
 
-            # 本地查找成功，追加使用 bilibili 搜索以获取增量
-            try:
-                sync(search_on_bilibili(search_content))
-                if more_search_list := search_song_list(search_content):
-                    delta = len(more_search_list.get_data()) - len(main_search_list.get_data())
-                    logger.info(f"bilibili 获取增量 {delta} 个有效视频数据:")
-                    main_search_list.append_list(more_search_list)
-            except Exception:
-                logger.exception("bilibili 搜索失败（增量阶段）")
 
-        return main_search_list
+def perform_search(search_content: str) -> SongList | None:
+    """执行搜索：先查本地，必要时或增量用 bilibili 搜索补充。
+
+    - 返回 SongList 或 None（未找到或出错）。
+    - 不做任何 UI 交互，仅记录日志。
+    """
+    result = None
+    try:
+        for result in iter_search(search_content):
+            pass
+        return result
 
     except Exception:
         logger.exception("执行搜索时发生未知错误")
-        return None
+        return result
@@ -1,40 +1,178 @@
+import heapq
+import itertools
 import json
 import re
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 from loguru import logger
 
+from src.utils.matcher import MultiPatternMatcher, get_matcher
+from src.utils.text import parse_timestamp
+
+
+class SongRecord(Mapping[str, Any]):
+    """一条视频记录
+
+    使用 __slots__ 存储固定字段，比普通 dict 更省内存；
+    同时实现 Mapping 接口，原有 info["title"] / info.get("bv") 的用法保持不变。
+    记录创建后视为只读，可以在多个 SongList 之间共享。
+    """
+
+    FIELDS = ("title", "author", "date", "url", "bv")
+    __slots__ = ("author", "bv", "date", "extra", "title", "url")
+
+    def __init__(
+        self,
+        title: str = "",
+        author: str = "",
+        date: int = 0,
+        url: str = "",
+        bv: str = "",
+        extra: dict[str, Any] | None = None,
+    ) -> None:
+        self.title = title
+        self.author = author
+        # 发布时间统一为整数时间戳（秒），0 表示未知
+        self.date = date
+        self.url = url
+        self.bv = bv
+        # 固定字段以外的附加信息，绝大多数记录为 None
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, song_info: Mapping[str, Any]) -> "SongRecord":
+        """从 dict 构建记录，过滤掉值为方法的条目，发布时间在此统一转换为时间戳"""
+        if isinstance(song_info, SongRecord):
+            return song_info
+        extra = {k: v for k, v in song_info.items() if k not in cls.FIELDS and not callable(v)}
+        return cls(
+            title=song_info.get("title", ""),
+            author=song_info.get("author", ""),
+            date=parse_timestamp(song_info.get("date", 0)),
+            url=song_info.get("url", ""),
+            bv=song_info.get("bv", ""),
+            extra=extra,
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key in SongRecord.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from SongRecord.FIELDS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(SongRecord.FIELDS) + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self) -> str:
+        return f"SongRecord({self.to_dict()!r})"
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为可 JSON 序列化的 dict"""
+        return dict(self.items())
+
 
 class SongList:
     def __init__(self, dir_path: Path | None = None):
         """创建空列表"""
-        self.dictInfo = {"data": []}
+        # 只读视图中为元组，外部拿到的数据也无法被修改
+        self._records: list[SongRecord] | tuple[SongRecord, ...] = []
+        # bv -> 行号 索引，随插入实时维护
+        self._index: dict[str, int] = {}
+        self._readonly = False
         if dir_path is not None:
             self.load_list(dir_path)
 
     def __len__(self):
         """返回数据长度"""
-        return len(self.dictInfo["data"])
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[SongRecord]:
+        return iter(self._records)
+
+    def readonly_view(self) -> "SongList":
+        """返回只读视图，记录保存为不可变的元组
+
+        对可修改的列表会复制一次记录引用，之后原列表的修改不会影响视图；
+        对只读视图再取视图时共享同一元组，为 O(1)。
+        """
+        view = SongList.__new__(SongList)
+        view._records = tuple(self._records)
+        view._index = self._index if self._readonly else dict(self._index)
+        view._readonly = True
+        return view
+
+    @property
+    def readonly(self) -> bool:
+        return self._readonly
+
+    def _check_writable(self) -> None:
+        if self._readonly:
+            raise TypeError("只读的 SongList 视图不能被修改")
 
     def clear(self):
         """清除列表"""
-        self.dictInfo = {"data": []}
+        self._check_writable()
+        self._records = []
+        self._index = {}
+
+    def _rebuild_index(self) -> None:
+        """重建 bv 索引（列表被整体替换或在外部重新排序后调用）"""
+        self._index = {record.bv: row for row, record in enumerate(self._records) if record.bv}
 
-    def append_info(self, song_info: dict):
-        """插入一条歌曲dict信息"""
-        # 过滤掉值为方法的条目
-        clean_song_info = {k: v for k, v in song_info.items() if not callable(v)}
-        self.dictInfo["data"].append(clean_song_info)
+    def _row_of(self, bv: str) -> int | None:
+        """查找 bv 所在的行号
+
+        get_data() 返回的列表可能被调用方原地排序，这里在命中错位时重建索引。
+        """
+        row = self._index.get(bv)
+        if row is None:
+            return None
+        if row < len(self._records) and self._records[row].bv == bv:
+            return row
+        self._rebuild_index()
+        return self._index.get(bv)
+
+    def _add(self, record: SongRecord) -> None:
+        """插入一条记录，bv 已存在时原地替换（与旧版 unique_by_bv 的保留顺序一致）"""
+        self._check_writable()
+        if not record.bv:
+            self._records.append(record)
+            return
+        row = self._row_of(record.bv)
+        if row is None:
+            self._index[record.bv] = len(self._records)
+            self._records.append(record)
+        else:
+            self._records[row] = record
+
+    def _replace(self, records: list[SongRecord]) -> None:
+        self._check_writable()
+        self._records = records
+        self._rebuild_index()
+
+    def append_info(self, song_info: Mapping[str, Any]):
+        """插入一条歌曲dict信息（按 bv 去重）"""
+        self._add(SongRecord.from_dict(song_info))
 
     def append_list(self, slist: "SongList"):
-        """插入一组songList信息"""
-        tmp_list = slist.get_data()
-        for songInfo in tmp_list:
-            self.append_info(songInfo)
-        self.unique_by_bv()
+        """插入一组songList信息（按 bv 去重）"""
+        for record in slist._records:
+            self._add(record)
 
-    def select_info(self, index: int) -> dict | None:
+    def extend(self, infos: Iterable[Mapping[str, Any]]) -> None:
+        """批量插入歌曲信息（按 bv 去重）"""
+        for info in infos:
+            self._add(SongRecord.from_dict(info))
+
+    def select_info(self, index: int) -> SongRecord | None:
         """
         选择index对应的歌曲信息
 
@@ -42,15 +180,30 @@ class SongList:
             index(int):指定项目的下标
 
         返回:
-            (dict):包含url,bv,date,author,title的dict
+            (SongRecord):包含url,bv,date,author,title的记录
         """
-        if 0 <= index < len(self.dictInfo["data"]):
-            return self.dictInfo["data"][index]
+        if 0 <= index < len(self._records):
+            return self._records[index]
+
+    def get_by_bv(self, bv: str) -> SongRecord | None:
+        """按 bv 号查找歌曲信息"""
+        row = self._row_of(bv)
+        return None if row is None else self._records[row]
+
+    def __contains__(self, bv: object) -> bool:
+        return isinstance(bv, str) and self._row_of(bv) is not None
+
+    def sort(self, key: Callable[[SongRecord], Any], reverse: bool = False) -> None:
+        """原地排序并同步索引"""
+        self._check_writable()
+        self._records.sort(key=key, reverse=reverse)
+        self._rebuild_index()
 
     def save_list(self, path: Path):
         """保存文件到指定的路径和文件名下"""
         try:
-            path.write_text(json.dumps(self.dictInfo, ensure_ascii=False, indent=2), encoding="utf-8")
+            data = {"data": [record.to_dict() for record in self._records]}
+            path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
         except Exception:
             logger.opt(exception=True).warning("json文件保存错误")
 
@@ -60,43 +213,40 @@ class SongList:
             return
 
         try:
-            self.dictInfo = json.loads(path.read_text(encoding="utf-8"))
+            dict_info = json.loads(path.read_text(encoding="utf-8"))
+            self.clear()
+            self.extend(dict_info["data"])
         except Exception:
             logger.opt(exception=True).warning("json文件读取错误:")
 
     def unique_by_bv(self):
-        """根据bv号进行去重"""
+        """根据bv号进行去重
+
+        插入时已按 bv 去重，这里仅用于处理在外部直接修改 get_data() 列表的情况。
+        """
         try:
-            result = {songInfo["bv"]: songInfo for songInfo in self.get_data()}
-            self.dictInfo = {"data": list(result.values())}
+            result: dict[object, SongRecord] = {}
+            for record in self._records:
+                # 没有 bv 的记录无法去重，原样保留
+                result[record.bv or id(record)] = record
+            self._replace(list(result.values()))
         except Exception:
             logger.opt(exception=True).warning("去重模块错误:")
 
     def search_by_title(self, title: str):
         """按空格分词后进行 AND 匹配；空查询返回全部。"""
         try:
-            q = (title or "").strip()
-            # 将连续空白（包含全角空格）作为分隔符
-            tokens = [t.lower() for t in re.split(r"\s+", q) if t]
-            if not tokens:
-                # 空查询：不筛选
-                return
-
-            data = self.dictInfo["data"]
-
-            def hit(s: str) -> bool:
-                tl = s.lower()
-                # 所有分词都需要命中
-                return all(tok in tl for tok in tokens)
-
-            songs = [songInfo for songInfo in data if hit(str(songInfo.get("title", "")))]
-            self.dictInfo = {"data": songs}
+            self._replace(list(self.query().match(title)))
         except Exception:
             logger.opt(exception=True).warning("标题搜索匹配错误")
 
-    def get_data(self) -> list[dict]:
-        """获取歌曲信息dict的列表,列表项为"""
-        return self.dictInfo["data"]
+    def query(self) -> "SongQuery":
+        """基于当前列表创建非破坏性的查询"""
+        return SongQuery(self)
+
+    def get_data(self) -> Sequence[SongRecord]:
+        """获取歌曲信息记录的序列（只读视图返回元组，不能借此修改共享的数据）"""
+        return self._records
 
     def remove_blacklist(self, words: str | list[str], types: Literal[0, 1] = 0):
         """
@@ -118,11 +268,7 @@ class SongList:
 
         key = "author" if types == 1 else "title"
         try:
-            result_list = []
-            for songInfo in self.dictInfo["data"]:
-                if all(word.lower() not in songInfo[key].lower() for word in words):
-                    result_list.append(songInfo)
-            self.dictInfo = {"data": result_list}
+            self._replace(list(self.query().exclude(words, key)))
             return 0
         except Exception:
             logger.opt(exception=True).warning("排除模块错误")
@@ -148,13 +294,134 @@ class SongList:
         key = "author" if types == 1 else "title"
 
         try:
-            result_list = []
-            for songInfo in self.dictInfo["data"]:
-                if any(word.lower() in songInfo[key].lower() for word in words):
-                    result_list.append(songInfo)
-
-            self.dictInfo = {"data": result_list}
+            self._replace(list(self.query().filter(words, key)))
             return 0
         except Exception:
             logger.opt(exception=True).warning("过滤模块错误")
             return 1
+
+
+Field = Literal["title", "author"]
+
+
+class SongQuery:
+    """惰性、非破坏性的 SongList 查询
+
+    filter → exclude → match → dedupe → rank → limit 等步骤只记录条件，
+    迭代时对底层列表做一次流式遍历，既不复制也不修改原列表：
+
+        songs.query().match("neuro").exclude(blacklist, "author").rank(key, reverse=True).limit(200).run()
+    """
+
+    def __init__(self, source: SongList) -> None:
+        self._source = source
+        self._candidates: Iterable[str] | None = None
+        self._predicates: list[Callable[[SongRecord], bool]] = []
+        self._dedupe = False
+        self._rank_key: Callable[[SongRecord], Any] | None = None
+        self._rank_reverse = False
+        self._limit: int | None = None
+
+    # -------- 构建 --------
+    def candidates(self, bvs: Iterable[str]) -> "SongQuery":
+        """只遍历给定的 bv（例如倒排索引的命中结果），按给定顺序输出"""
+        self._candidates = bvs
+        return self
+
+    def where(self, predicate: Callable[[SongRecord], bool]) -> "SongQuery":
+        """追加任意过滤条件"""
+        self._predicates.append(predicate)
+        return self
+
+    @staticmethod
+    def _matcher(words: str | Iterable[str]) -> MultiPatternMatcher:
+        words = [words] if isinstance(words, str) else list(words)
+        if any(not isinstance(word, str) for word in words):
+            raise TypeError("words参数类型错误")
+        return get_matcher(words)
+
+    def filter(self, words: str | Iterable[str], field: Field = "title") -> "SongQuery":
+        """仅保留指定字段包含任意一个 word 的记录（不区分大小写）"""
+        matcher = self._matcher(words)
+        return self.where(lambda r: matcher.search(str(r[field])))
+
+    def exclude(self, words: str | Iterable[str], field: Field = "title") -> "SongQuery":
+        """排除指定字段包含任意一个 word 的记录（不区分大小写）"""
+        matcher = self._matcher(words)
+        if not matcher:
+            return self
+        return self.where(lambda r: not matcher.search(str(r[field])))
+
+    def match(self, query: str) -> "SongQuery":
+        """标题按空格分词后进行 AND 匹配；空查询不筛选"""
+        # 将连续空白（包含全角空格）作为分隔符
+        tokens = [t.lower() for t in re.split(r"\s+", (query or "").strip()) if t]
+        if not tokens:
+            return self
+        return self.where(lambda r: all(tok in str(r.title).lower() for tok in tokens))
+
+    def published_between(self, start: int | None = None, end: int | None = None) -> "SongQuery":
+        """仅保留发布时间戳在 [start, end] 内的记录，省略的一端不限制"""
+        lo = start if start is not None else 0
+        hi = end if end is not None else float("inf")
+        return self.where(lambda r: lo <= r.date <= hi)
+
+    def dedupe(self) -> "SongQuery":
+        """按 bv 去重，保留首次出现的记录"""
+        self._dedupe = True
+        return self
+
+    def rank(self, key: Callable[[SongRecord], Any], reverse: bool = False) -> "SongQuery":
+        self._rank_key = key
+        self._rank_reverse = reverse
+        return self
+
+    def limit(self, n: int) -> "SongQuery":
+        self._limit = max(0, n)
+        return self
+
+    # -------- 执行 --------
+    def _iter_source(self) -> Iterator[SongRecord]:
+        if self._candidates is None:
+            yield from self._source.get_data()
+            return
+        for bv in self._candidates:
+            if (record := self._source.get_by_bv(bv)) is not None:
+                yield record
+
+    def __iter__(self) -> Iterator[SongRecord]:
+        it: Iterable[SongRecord] = self._iter_source()
+        for predicate in self._predicates:
+            it = filter(predicate, it)
+        if self._dedupe:
+            it = self._iter_unique(it)
+
+        if self._rank_key is not None:
+            if self._limit is not None:
+                # 只需前 k 条时用堆选择，与排序后截断结果一致
+                pick = heapq.nlargest if self._rank_reverse else heapq.nsmallest
+                return iter(pick(self._limit, it, key=self._rank_key))
+            return iter(sorted(it, key=self._rank_key, reverse=self._rank_reverse))
+        if self._limit is not None:
+            return itertools.islice(it, self._limit)
+        return iter(it)
+
+    @staticmethod
+    def _iter_unique(records: Iterable[SongRecord]) -> Iterator[SongRecord]:
+        seen: set[str] = set()
+        for record in records:
+            if record.bv:
+                if record.bv in seen:
+                    continue
+                seen.add(record.bv)
+            yield record
+
+    def run(self) -> SongList:
+        """执行查询，返回新的 SongList（与原列表共享记录对象）"""
+        result = SongList()
+        for record in self:
+            result._add(record)
+        return result
+
+    def count(self) -> int:
+        return sum(1 for _ in self)
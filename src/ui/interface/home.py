@@ -563,7 +563,9 @@ class SongStatsCard(CardWidget):
         import os
 
         try:
-            song_files = [f for f in os.listdir(MUSIC_DIR) if f.lower().endswith((".mp3", ".ogg", ".wav"))]
+            song_files = [
+                f for f in os.listdir(MUSIC_DIR) if f.lower().endswith((".mp3", ".ogg", ".wav", ".m4a", ".opus"))
+            ]
             song_count = len(song_files)
 
             total_size = sum(os.path.getsize(os.path.join(MUSIC_DIR, f)) for f in song_files)
@@ -512,7 +512,7 @@ class LocalPlayerInterface(QWidget):
                 # 检查是否为音频文件
                 for url in mime_data.urls():
                     file_path = url.toLocalFile()
-                    if Path(file_path).suffix.lower() in [".mp3", ".wav", ".ogg", ".flac", ".m4a"]:
+                    if Path(file_path).suffix.lower() in [".mp3", ".wav", ".ogg", ".flac", ".m4a", ".opus"]:
                         a0.acceptProposedAction()
                         return
             a0.ignore()
@@ -537,7 +537,14 @@ class LocalPlayerInterface(QWidget):
                 imported_count = 0
                 for url in mime_data.urls():
                     file_path = Path(url.toLocalFile())
-                    if file_path.is_file() and file_path.suffix.lower() in [".mp3", ".wav", ".ogg", ".flac", ".m4a"]:
+                    if file_path.is_file() and file_path.suffix.lower() in [
+                        ".mp3",
+                        ".wav",
+                        ".ogg",
+                        ".flac",
+                        ".m4a",
+                        ".opus",
+                    ]:
                         try:
                             self._import_audio_file(file_path)
                             imported_count += 1
@@ -581,7 +588,7 @@ class LocalPlayerInterface(QWidget):
 
         imported_count = 0
         for file_path in folder_path.glob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in [".mp3", ".wav", ".ogg", ".flac", ".m4a"]:
+            if file_path.is_file() and file_path.suffix.lower() in [".mp3", ".wav", ".ogg", ".flac", ".m4a", ".opus"]:
                 try:
                     self._import_audio_file(file_path)
                     imported_count += 1
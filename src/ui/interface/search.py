@@ -20,23 +20,26 @@ from qfluentwidgets import (
 
 from src.i18n import t
 from src.app_context import app_context
-from src.bili_api import create_video_list_file, run_music_download, search_song_list, get_video_parts_sync
+from src.bili_api import create_video_list_file, run_music_download, search_song_list, get_video_parts
 from src.config import ASSETS_DIR, MUSIC_DIR, cfg
 from src.core.song_list import SongList
 from src.core.search_core import (
-    perform_search,
+    iter_search,
     sort_song_list_by_date_desc,
-    sort_song_list_by_relevance,
+    rank_song_list,
 )
 from src.core.download_queue import DownloadQueueManager, DownloadTask
 from src.ui.components.download_queue_dialog import DownloadQueueDialog
 from src.ui.components.part_selection_dialog import MultiPartChoiceDialog, PartSelectionDialog
-from src.utils.text import fix_filename, format_date_str
-from src.utils.thread import SimpleThread
+from src.utils.text import fix_filename, format_timestamp
+from src.utils.thread import AsyncTask, SimpleThread, StreamThread
 
 if TYPE_CHECKING:
     from src.ui.main_window import MainWindow
 
+# 搜索结果表格最多展示的行数，排序时只需选出这么多条
+MAX_RESULT_ROWS = 500
+
 
 def showLoading(target):
     """加载动画实现"""
@@ -58,7 +61,9 @@ class SearchInterface(QWidget):
 
     def __init__(self, parent, main_window: "MainWindow"):
         super().__init__(parent=parent)
-        self._search_ = None
+        self._search_thread: StreamThread | None = None
+        # 持有所有未结束的搜索线程（包括已取消的），避免线程运行中被回收
+        self._running_search_threads: set[StreamThread] = set()
         self.main_window = main_window
 
         self.stateTooltip = None
@@ -214,29 +219,15 @@ class SearchInterface(QWidget):
         except Exception:
             logger.exception("获取歌曲列表失败")
 
-    @staticmethod
-    def do_search(search_content: str):
-        result = perform_search(search_content)
-        if result is None:
-            logger.warning(t("search.search_result_empty"))
-            InfoBar.warning(
-                title=t("common.warning"),
-                content=t("search.no_results"),
-                orient=Qt.Orientation.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.BOTTOM_RIGHT,
-                parent=app_context.main_window,
-                duration=2000,
-            )
-        return result
-
-    def on_search_finished(self, main_search_list: SongList | None) -> None:
-        # 写入表格和数据
-        if main_search_list is not None:
-            # 排序：按搜索相关度
-            sort_song_list_by_relevance(main_search_list, self._last_query)
-            self.search_result = main_search_list
-            self.writeList()
+    def on_search_increment(self, main_search_list: SongList, thread: StreamThread) -> None:
+        """搜索结果增量到达：合并、重排并刷新表格"""
+        # 已被新查询取代的旧结果直接丢弃
+        if thread is not self._search_thread or thread.is_cancelled():
+            return
+
+        # 排序：按搜索相关度，只取表格展示的前若干条
+        self.search_result = rank_song_list(main_search_list, self._last_query, MAX_RESULT_ROWS)
+        self.writeList()
         if model := self.tableView.model():
             self.tableView.setCurrentIndex(model.index(0, 0))
         # 调整除标题外的列宽
@@ -244,14 +235,34 @@ class SearchInterface(QWidget):
             self.tableView.resizeColumnToContents(col)
         # 根据窗口大小给标题列设置一个自适应上限
         self._update_title_column_width()
+
+        # 首批结果到达后即可关闭加载动画，后续增量在后台继续合并
+        if self.loading:
+            self.loading.close()
+            self.loading = None
+
+    def on_search_finished(self, cancelled: bool, thread: StreamThread) -> None:
+        if cancelled or thread is not self._search_thread:
+            return
+
+        self._search_thread = None
         self.searching = False
-        self.search_input.searchButton.setEnabled(True)
 
         if self.loading:
             self.loading.close()
             self.loading = None
 
-        self.main_window.setEnabled(True)
+        if not self.search_result.get_data():
+            logger.warning(t("search.search_result_empty"))
+            InfoBar.warning(
+                title=t("common.warning"),
+                content=t("search.no_results"),
+                orient=Qt.Orientation.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.BOTTOM_RIGHT,
+                parent=app_context.main_window,
+                duration=2000,
+            )
 
         logger.success("搜索完成！")
         if self.search_tip is not None:
@@ -260,32 +271,44 @@ class SearchInterface(QWidget):
             self.search_tip = None
 
     def search_btn(self):
-        """实现搜索按钮功能"""
-        if self.searching:
-            return
+        """实现搜索按钮功能（后台执行，新查询会取消尚未完成的旧查询）"""
+        if self._search_thread is not None:
+            logger.info("取消上一次尚未完成的搜索")
+            self._search_thread.cancel()
+            self._search_thread = None
 
         self.tableView.clear()
         self.tableView.setColumnCount(4)
         self.tableView.setHorizontalHeaderLabels(
             [t("common.header_title"), t("common.video_blogger"), t("common.date"), t("common.bvid")]
         )
-        self.search_result.clear()
+        self.tableView.setRowCount(0)
+        # 不原地清空：下载队列中的任务可能仍持有旧结果列表
+        self.search_result = SongList()
 
         # 显示加载动画
-        self.loading = showLoading(self.search_input)
-
-        tip = StateToolTip(t("search.searching_song"), t("search.please_wait"), self)
-        tip.move(tip.getSuitablePos())
-        tip.show()
-        self.search_tip = tip
+        if self.loading is None:
+            self.loading = showLoading(self.search_input)
+
+        if self.search_tip is None:
+            tip = StateToolTip(t("search.searching_song"), t("search.please_wait"), self)
+            tip.move(tip.getSuitablePos())
+            tip.show()
+            self.search_tip = tip
         self.searching = True
-        self.search_input.searchButton.setEnabled(False)
 
         logger.info("---搜索开始---")
         search_content = self.search_input.text().lower()
         self._last_query = search_content
-        self._search_ = self.do_search(search_content)
-        self.on_search_finished(self._search_)
+
+        thread = StreamThread(lambda is_cancelled, q=search_content: iter_search(q, is_cancelled))
+        thread.item_ready.connect(lambda result, th=thread: self.on_search_increment(result, th))
+        thread.task_finished.connect(lambda cancelled, th=thread: self.on_search_finished(cancelled, th))
+        thread.finished.connect(lambda th=thread: self._running_search_threads.discard(th))
+        thread.finished.connect(thread.deleteLater)
+        self._search_thread = thread
+        self._running_search_threads.add(thread)
+        thread.start()
 
     # 当爬虫任务结束时
     def on_c_task_finished(self):
@@ -423,7 +446,7 @@ class SearchInterface(QWidget):
         for i, songInfo in enumerate(search_result.get_data()):
             self.tableView.setItem(i, 0, QTableWidgetItem(songInfo["title"]))
             self.tableView.setItem(i, 1, QTableWidgetItem(songInfo["author"]))
-            self.tableView.setItem(i, 2, QTableWidgetItem(format_date_str(songInfo["date"])))
+            self.tableView.setItem(i, 2, QTableWidgetItem(format_timestamp(songInfo["date"])))
             self.tableView.setItem(i, 3, QTableWidgetItem(songInfo["bv"]))
 
     def _on_table_double_click(self, row: int, _column: int) -> None:
@@ -475,10 +498,31 @@ class SearchInterface(QWidget):
         self.DownloadBtn.setEnabled(False)
         self.main_window.setEnabled(False)
 
-        # 启动线程获取分P信息
-        self._parts_thread = SimpleThread(lambda: get_video_parts_sync(bvid))
-        self._parts_thread.task_finished.connect(lambda parts: self.on_parts_fetched(parts, index, info))
-        self._parts_thread.start()
+        # 在共享事件循环中获取分P信息
+        self._parts_task = AsyncTask(lambda: get_video_parts(bvid))
+        self._parts_task.task_finished.connect(lambda parts: self.on_parts_fetched(parts, index, info))
+        self._parts_task.task_failed.connect(self.on_parts_failed)
+        self._parts_task.start()
+
+    def on_parts_failed(self, error: BaseException):
+        """分P信息获取失败的回调：恢复界面，否则主窗口会一直处于禁用状态"""
+        logger.warning(f"获取分P信息失败: {error}")
+        if self.loading:
+            self.loading.close()
+            self.loading = None
+        self.main_window.setEnabled(True)
+        self.DownloadBtn.setEnabled(True)
+        self._parts_task = None
+
+        InfoBar.error(
+            title=t("common.error"),
+            content=t("search.download_failed"),
+            orient=Qt.Orientation.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.TOP,
+            duration=3000,
+            parent=self,
+        )
 
     def on_parts_fetched(self, parts_info: list[dict], index: int, info: dict):
         """分P信息获取完成后的回调"""
@@ -493,7 +537,7 @@ class SearchInterface(QWidget):
         # 为了用户体验，这里先恢复，让用户可以操作对话框
         self.main_window.setEnabled(True)
         self.DownloadBtn.setEnabled(True)
-        self._parts_thread = None
+        self._parts_task = None
 
         fileType = cfg.download_type.value
         title = fix_filename(info["title"]).replace(" ", "").replace("_", "", 1)
@@ -162,7 +162,7 @@ class SettingsCard(GroupHeaderCardWidget):
         self.languageComboBox.currentIndexChanged.connect(lambda idx: changeLanguage(language_items[idx]))
 
         # 下载格式设置（保持原有代码）
-        items = ["mp3", "ogg", "wav"]
+        items = list(cfg.download_type.options)
         self.downloadFormatComboBox = ComboBox(self)
         self.downloadFormatComboBox.addItems(items)
         self.downloadFormatComboBox.setCurrentIndex(items.index(cfg.download_type.value))
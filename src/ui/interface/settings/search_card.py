@@ -19,8 +19,9 @@ from qfluentwidgets import (
 
 from src.i18n import t
 from src.app_context import app_context
-from src.bili_api import get_up_name, get_up_names
+from src.bili_api import get_cached_up_names, get_up_names
 from src.config import cfg
+from src.utils.thread import SimpleThread
 
 
 class ListEditWidget(CardGroupWidget):
@@ -61,13 +62,15 @@ class ListEditWidget(CardGroupWidget):
             self.add_btn(item)
             self.refresh_layout()
 
-    def add_btn(self, text: str):
+    def add_btn(self, text: str) -> PushButton | None:
         try:
             btn = PushButton(text)
             btn.clicked.connect(lambda: self.on_remove_item(btn))
             self._layout.addWidget(btn)
+            return btn
         except Exception as e:
             logger.error(f"添加按钮失败: {e}")
+            return None
 
     def refresh_layout(self):
         logger.info(t("settings.layout_updated"))
@@ -180,14 +183,48 @@ class FilterEditWidget(ListEditWidget):
 
 class UpListEditWidget(ListEditWidget):
     def __init__(self, parent: QWidget) -> None:
-        self.names = get_up_names(cfg.up_list.value)
+        # 先用缓存中的名称立即显示，再在后台刷新
+        self.names = get_cached_up_names(cfg.up_list.value)
+        self._buttons: dict[int, PushButton] = {}
+        self._refresh_threads: set[SimpleThread] = set()
         super().__init__(
             FluentIcon.PEOPLE,
             t("settings.up_list_title"),
             t("settings.up_list_desc"),
             parent,
-            self.names.values(),
+            [],
         )
+        for uid, name in self.names.items():
+            self.add_up_btn(uid, name)
+        self.refresh_layout()
+        self.refresh_names(list(self.names))
+
+    def add_up_btn(self, uid: int, name: str) -> None:
+        if (btn := super().add_btn(name)) is not None:
+            self._buttons[uid] = btn
+
+    def refresh_names(self, uids: list[int]) -> None:
+        """在后台获取UP主名称，完成后更新按钮文字"""
+        if not uids:
+            return
+        thread = SimpleThread(lambda: get_up_names(uids))
+        thread.task_finished.connect(self.on_names_refreshed)
+        thread.finished.connect(lambda: self._refresh_threads.discard(thread))
+        self._refresh_threads.add(thread)
+        thread.start()
+
+    def on_names_refreshed(self, names: dict[int, str]) -> None:
+        changed = False
+        for uid, name in names.items():
+            # 刷新期间可能已被删除
+            if uid not in self.names or self.names[uid] == name:
+                continue
+            self.names[uid] = name
+            if (btn := self._buttons.get(uid)) is not None:
+                btn.setText(name)
+                changed = True
+        if changed:
+            self.refresh_layout()
 
     def remove_item(self, item: str) -> None:
         try:
@@ -195,6 +232,7 @@ class UpListEditWidget(ListEditWidget):
             cfg.up_list.value.remove(user_id)
             cfg.save()
             del self.names[user_id]
+            self._buttons.pop(user_id, None)
             logger.info(f"当前UP主列表为 {cfg.up_list.value}")
         except Exception:
             logger.exception("删除UP主时发生错误")
@@ -231,9 +269,12 @@ class UpListEditWidget(ListEditWidget):
             cfg.save()
             logger.info(f"当前UP主列表为 {cfg.up_list.value}")
 
-            self.names[uid] = get_up_name(uid)
-            super().add_btn(self.names[uid])
+            if uid in self.names:
+                return None
+            self.names[uid] = get_cached_up_names([uid])[uid]
+            self.add_up_btn(uid, self.names[uid])
             super().refresh_layout()
+            self.refresh_names([uid])
             return self.names[uid]
         except Exception:
             logger.exception("添加UP主时发生错误")
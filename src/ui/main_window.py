@@ -117,10 +117,6 @@ class MainWindow(FluentWindow):
         # self.player_bar.show()
         app_context.player = self.player_bar
 
-        # 设置默认音频格式
-        cfg.download_type.value = "mp3"
-        cfg.save()
-
         # 尝试恢复上次的播放队列（如果当前队列为空）
         try:
             if not app_context.play_queue:
@@ -0,0 +1,136 @@
+"""带过期时间的持久化键值缓存
+
+数据以 JSON 形式存放在 CACHE_DIR/cache.db（SQLite）中，不同用途按 namespace 区分。
+读取时可以只取未过期的条目，也可以连同条目的“年龄”一起取出，由调用方决定
+是否先返回旧数据再后台刷新。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from src.config import CACHE_DIR
+
+CACHE_PATH = CACHE_DIR / "cache.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+# SQLite 单条语句的参数个数有上限，批量查询时分块
+_CHUNK = 500
+
+
+class PersistentTTLCache:
+    """某个 namespace 下的持久化缓存
+
+    所有线程共用一个连接并由锁串行化访问，结束的线程不会遗留未关闭的连接。
+    """
+
+    def __init__(self, namespace: str, ttl: float, path: Path = CACHE_PATH) -> None:
+        self.namespace = namespace
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn as conn:
+            conn.execute(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # -------- 读取 --------
+    def get_entry(self, key: str) -> tuple[Any, float] | None:
+        """返回 (值, 已缓存秒数)，不论是否过期；不存在时返回 None"""
+        rows = self._query(
+            "SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        try:
+            return json.loads(row[0]), time.time() - row[1]
+        except ValueError:
+            logger.warning(f"缓存条目损坏，已忽略: {self.namespace}/{key}")
+            return None
+
+    def get(self, key: str, max_age: float | None = None) -> Any | None:
+        """返回未过期的值（默认以 ttl 为准），过期或不存在时返回 None"""
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > (self.ttl if max_age is None else max_age):
+            return None
+        return entry[0]
+
+    def get_many(self, keys: Iterable[str], max_age: float | None = None) -> dict[str, Any]:
+        """批量读取未过期的值，返回命中部分"""
+        deadline = time.time() - (self.ttl if max_age is None else max_age)
+        keys = list(keys)
+        result: dict[str, Any] = {}
+        for i in range(0, len(keys), _CHUNK):
+            chunk = keys[i : i + _CHUNK]
+            rows = self._query(
+                f"SELECT key, value FROM cache WHERE namespace = ? AND stored_at >= ? "
+                f"AND key IN ({','.join('?' * len(chunk))})",
+                (self.namespace, deadline, *chunk),
+            )
+            for key, value in rows:
+                try:
+                    result[key] = json.loads(value)
+                except ValueError:
+                    logger.warning(f"缓存条目损坏，已忽略: {self.namespace}/{key}")
+        return result
+
+    # -------- 写入 --------
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: Mapping[str, Any]) -> None:
+        now = time.time()
+        rows = [(self.namespace, key, json.dumps(value, ensure_ascii=False), now) for key, value in items.items()]
+        if not rows:
+            return
+        with self._lock, self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        with self._lock, self._conn as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+
+_caches: dict[str, PersistentTTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_persistent_cache(namespace: str, ttl: float) -> PersistentTTLCache:
+    """获取进程内共享的持久化缓存（同一 namespace 只创建一次）"""
+    with _caches_lock:
+        if (cache := _caches.get(namespace)) is None:
+            cache = _caches[namespace] = PersistentTTLCache(namespace, ttl)
+        return cache
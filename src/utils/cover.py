@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 from pathlib import Path
-import re
 from typing import Optional
 
+import aiohttp
 from loguru import logger
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QPainter, QPixmap
 from qfluentwidgets import FluentIcon as FIF
 
-import requests
-from bilibili_api import video, sync
-
-from src.config import CACHE_DIR, VIDEO_DIR, ASSETS_DIR, USER_AGENT
-from src.core.data_io import load_from_all_data
-from src.bili_api.common import get_credential
+from src.config import CACHE_DIR, ASSETS_DIR
+from src.core.catalog import get_catalog
+from src.utils.runtime import get_http_session, run_sync
+from src.utils.text import normalize_title
+from src.bili_api.common import rewrite_url
+from src.bili_api.video_info import get_video_info_sync
 
 
 def _load_pixmap_from_file(fp: Path, size: int) -> QPixmap | None:
@@ -170,37 +170,22 @@ def _fallback_app_icon(size: int) -> QPixmap:
 
 # ---------------------- Bilibili helpers ----------------------
 
-_KEEP_CHARS = re.compile(r"[\u4e00-\u9fff\w]+", re.UNICODE)
-
-
-def _normalize_text(s: str) -> str:
-    s = s.lower()
-    parts = _KEEP_CHARS.findall(s)
-    s = "".join(parts)
-    # 去掉常见后缀
-    s = s.replace("fix", "")
-    return s
-
 
 def _match_bvid_by_audio(audio_path: Path) -> Optional[str]:
-    """根据音频文件名在本地视频数据里匹配 BV 号。
+    """根据音频文件名在本地视频目录里匹配 BV 号。
 
     策略：归一化文件名与标题，互相包含则认为匹配，取最优（最长匹配）。
+    候选集由视频目录的 FTS 三字索引给出，无需遍历全部标题。
     """
     try:
-        total = load_from_all_data(VIDEO_DIR)
-        if not total:
-            return None
-        stem_norm = _normalize_text(audio_path.stem)
+        stem_norm = normalize_title(audio_path.stem)
         if not stem_norm:
             return None
         best = (0, None)  # (score, bvid)
-        for item in total.get_data():
-            title = str(item.get("title", ""))
-            bvid = item.get("bv")
+        for bvid, title in get_catalog().match_title_candidates(stem_norm):
             if not bvid:
                 continue
-            title_norm = _normalize_text(title)
+            title_norm = normalize_title(str(title))
             if not title_norm:
                 continue
             score = 0
@@ -216,27 +201,21 @@ def _match_bvid_by_audio(audio_path: Path) -> Optional[str]:
         return None
 
 
+async def _download_bytes(url: str) -> bytes | None:
+    session = await get_http_session()
+    async with session.get(rewrite_url(url), timeout=aiohttp.ClientTimeout(total=8)) as resp:
+        if resp.status != 200:
+            return None
+        return await resp.read() or None
+
+
 def _fetch_bilibili_cover_bytes(bvid: str) -> Optional[bytes]:
     """通过 BVID 获取视频封面二进制数据。"""
     try:
-        v = video.Video(bvid, credential=get_credential())
-        info = sync(v.get_info())
-        # 常见结构含 pic 或 View.pic
-        cover_url = None
-        if isinstance(info, dict):
-            cover_url = info.get("pic")
-            if not cover_url and "View" in info and isinstance(info["View"], dict):
-                cover_url = info["View"].get("pic")
+        cover_url = get_video_info_sync(bvid).get("pic")
         if not cover_url:
             return None
-        resp = requests.get(
-            cover_url,
-            timeout=8,
-            headers={"User-Agent": USER_AGENT},
-        )
-        if resp.status_code == 200 and resp.content:
-            return resp.content
-        return None
+        return run_sync(_download_bytes(cover_url))
     except Exception:
         logger.exception(f"下载封面失败: {bvid}")
         return None
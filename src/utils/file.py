@@ -93,14 +93,14 @@ def read_all_audio_info(
 
     参数:
         directory (str | Path): 要扫描的目录
-        extensions (list): 支持的音频扩展名列表，默认为 [".mp3", ".ogg", ".wav"]
+        extensions (list): 支持的音频扩展名列表，默认为下载可选的格式 [".mp3", ".ogg", ".wav", ".m4a", ".opus"]
 
     返回:
         list[tuple[str, float]]: [(文件名, 时长), ...]
     """
 
     if extensions is None:
-        extensions = [".mp3", ".ogg", ".wav"]
+        extensions = [".mp3", ".ogg", ".wav", ".m4a", ".opus"]
 
     results: list[tuple[str, float]] = []
 
@@ -153,7 +153,7 @@ def clean_audio_file(input_path, output_path, target_format="mp3"):
         return False
 
 
-SUPPORTED_EXTENSIONS = [".mp3", ".ogg", ".wav", ".flac", ".m4a", ".aac"]
+SUPPORTED_EXTENSIONS = [".mp3", ".ogg", ".wav", ".flac", ".m4a", ".aac", ".opus"]
 
 
 def batch_clean_audio_files(
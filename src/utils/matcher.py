@@ -0,0 +1,96 @@
+"""多模式字符串匹配（Aho-Corasick）
+
+过滤词、黑名单、爬取关键词等场景需要判断一段文本是否包含若干个词中的任意一个。
+逐词 `word in text` 的开销随词数线性增长；这里把所有词编译成一个自动机，
+每段文本只需线性扫描一次。
+"""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+
+class MultiPatternMatcher:
+    """Aho-Corasick 自动机"""
+
+    __slots__ = ("_fail", "_goto", "_matches_empty", "_out", "ignore_case", "patterns")
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True) -> None:
+        self.ignore_case = ignore_case
+        self.patterns = tuple(dict.fromkeys(p.lower() if ignore_case else p for p in patterns))
+        # 空串是任何文本的子串，与 `"" in text` 的语义保持一致
+        self._matches_empty = "" in self.patterns
+
+        # 节点 0 为根；_out[node] 为以该节点结尾的模式下标
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        for idx, pattern in enumerate(self.patterns):
+            if pattern:
+                self._insert(idx, pattern)
+        self._build_fail_links()
+
+    def _insert(self, idx: int, pattern: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (idx,)
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def _scan(self, text: str) -> Iterator[tuple[int, ...]]:
+        if self.ignore_case:
+            text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                yield out[node]
+
+    def search(self, text: str) -> bool:
+        """文本是否包含任意一个模式"""
+        if self._matches_empty:
+            return True
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def find_all(self, text: str) -> set[str]:
+        """返回文本中出现过的全部模式"""
+        found = {self.patterns[idx] for hits in self._scan(text) for idx in hits}
+        if self._matches_empty:
+            found.add("")
+        return found
+
+
+@lru_cache(maxsize=32)
+def _compile(patterns: tuple[str, ...], ignore_case: bool) -> MultiPatternMatcher:
+    return MultiPatternMatcher(patterns, ignore_case)
+
+
+def get_matcher(patterns: Iterable[str], ignore_case: bool = True) -> MultiPatternMatcher:
+    """获取编译好的匹配器；词表内容不变时复用同一个自动机，变化后才重新构建"""
+    return _compile(tuple(patterns), ignore_case)
@@ -0,0 +1,142 @@
+"""进程内共享的异步运行时
+
+一个常驻的后台线程运行唯一的 asyncio 事件循环，所有网络请求都提交到这里执行：
+
+- bilibili_api 按事件循环缓存其 HTTP 客户端，在同一个循环中执行即可复用连接；
+- get_http_session() 提供共享的 aiohttp 会话（连接池 + keep-alive），用于封面、网页等其它请求；
+- 任意线程都可以用 run_sync() 同步等待结果，或用 submit() 得到 concurrent.futures.Future
+  （UI 线程请使用 src.utils.thread.AsyncTask，通过信号接收结果）。
+
+事件循环线程中不能调用 run_sync()（会死锁），协程内部请直接 await。
+"""
+
+import asyncio
+import atexit
+import threading
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from typing import Any
+
+import aiohttp
+from loguru import logger
+
+from src.config import USER_AGENT
+
+# 共享连接池参数：总连接数、单域名连接数、空闲连接保活时间（秒）
+POOL_LIMIT = 32
+POOL_LIMIT_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60
+# 默认超时只限制建立连接与单次读取，不限制总时长（下载大文件也走这个会话）
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+
+
+class AsyncRuntime:
+    """在后台线程中运行的事件循环与共享 HTTP 会话"""
+
+    def __init__(self, name: str = "async-runtime") -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """事件循环（首次访问时启动后台线程）"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit[T](self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """在事件循环中调度协程，立即返回 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run[T](self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """在事件循环中执行协程并阻塞等待结果"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("不能在事件循环线程中同步等待协程，请直接 await")
+        return self.submit(coro).result(timeout)
+
+    async def session(self) -> aiohttp.ClientSession:
+        """共享的 aiohttp 会话，只能在本运行时的事件循环中使用"""
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("共享 HTTP 会话只能在共享事件循环中使用")
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=POOL_LIMIT,
+                    limit_per_host=POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+                headers={"User-Agent": USER_AGENT, "Referer": "https://www.bilibili.com/"},
+            )
+        return self._session
+
+    async def _close_session(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """关闭共享会话并停止事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout)
+        except (TimeoutError, aiohttp.ClientError, OSError):
+            logger.opt(exception=True).warning("关闭共享 HTTP 会话失败")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+_runtime: AsyncRuntime | None = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    """获取进程内共享的异步运行时"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+            atexit.register(_runtime.shutdown)
+        return _runtime
+
+
+def run_sync[T](coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """在共享事件循环中执行协程并阻塞等待结果（替代 bilibili_api.sync）"""
+    return get_runtime().run(coro, timeout)
+
+
+def submit[T](coro: Coroutine[Any, Any, T]) -> Future[T]:
+    """在共享事件循环中后台执行协程"""
+    return get_runtime().submit(coro)
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """共享的 aiohttp 会话（须在共享事件循环中调用）"""
+    return await get_runtime().session()
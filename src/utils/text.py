@@ -1,15 +1,35 @@
 import re
 import time
 from collections.abc import Iterable
+from datetime import datetime
 
 from loguru import logger
 
 from src.i18n import t
+from src.utils.matcher import get_matcher
 
 
 def contain_text(words_set: Iterable[str], text: str) -> bool:
-    """检测是否包含内容"""
-    return any(word in text for word in words_set)
+    """检测是否包含内容（区分大小写，词表编译为多模式匹配器后复用）"""
+    return get_matcher(words_set, ignore_case=False).search(text)
+
+
+_KEEP_CHARS = re.compile(r"[\u4e00-\u9fff\w]+", re.UNICODE)
+
+
+def normalize_title(s: str) -> str:
+    """归一化标题/文件名：小写，仅保留中文与单词字符，去掉常见后缀"""
+    s = s.lower()
+    parts = _KEEP_CHARS.findall(s)
+    s = "".join(parts)
+    # 去掉常见后缀
+    s = s.replace("fix", "")
+    return s
+
+
+def split_query(query: str) -> list[str]:
+    """将连续空白（包含全角空格）作为分隔符，返回小写分词"""
+    return [tok.lower() for tok in re.split(r"\s+", (query or "").strip()) if tok]
 
 
 def remove_text_after_char(text: str, after_char: str) -> str:
@@ -66,6 +86,38 @@ def format_date_str(date: str) -> str:
         return date
 
 
+def parse_timestamp(date: object) -> int:
+    """将各种格式的发布时间统一为整数时间戳（秒），无法解析时返回 0
+
+    支持整数时间戳、"%Y-%m-%d %H:%M:%S" 以及网页上爬取的日期文本（见 format_date_str）。
+    """
+    if isinstance(date, (int, float)):
+        return int(date)
+    text = str(date or "").strip()
+    if not text or text == "Unknown":
+        return 0
+    if text.isdigit():
+        return int(text)
+    try:
+        return int(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp())
+    except ValueError:
+        pass
+    try:
+        return int(datetime.strptime(format_date_str(text), "%Y-%m-%d").timestamp())
+    except ValueError:
+        return 0
+
+
+def format_timestamp(timestamp: object) -> str:
+    """将发布时间戳格式化为 YYYY-MM-DD 用于显示，未知时间返回空字符串"""
+    if not isinstance(timestamp, int):
+        # 尚未迁移的旧数据
+        return format_date_str(str(timestamp)) if timestamp else ""
+    if timestamp <= 0:
+        return ""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
 def escape_tag(s: str) -> str:
     """用于记录带颜色日志时转义 `<tag>` 类型特殊标签
 
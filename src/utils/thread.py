@@ -1,5 +1,11 @@
-from collections.abc import Callable
-from PyQt6.QtCore import QThread, pyqtSignal
+from collections.abc import Callable, Coroutine, Generator
+from concurrent.futures import Future
+from typing import Any
+
+from loguru import logger
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from src.utils.runtime import submit
 
 
 class SimpleThread(QThread):
@@ -11,3 +17,75 @@ class SimpleThread(QThread):
 
     def run(self):
         self.task_finished.emit(self.call())
+
+
+class StreamThread(QThread):
+    """在后台线程中迭代生成器，每产出一项就通过信号发回 UI 线程
+
+    call 接收一个返回是否已取消的函数，生成器可据此提前结束耗时步骤。
+    调用 cancel() 后不再发出 item_ready，并在下一次产出时关闭生成器。
+    """
+
+    item_ready: pyqtSignal = pyqtSignal(object)
+    task_finished: pyqtSignal = pyqtSignal(bool)  # 参数为是否被取消
+
+    def __init__(self, call: Callable[[Callable[[], bool]], Generator[object]]) -> None:
+        super().__init__(None)
+        self.call = call
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self):
+        gen = self.call(self.is_cancelled)
+        try:
+            for item in gen:
+                if self._cancelled:
+                    break
+                self.item_ready.emit(item)
+        except Exception:
+            logger.exception("后台流式任务出错")
+        finally:
+            gen.close()
+            self.task_finished.emit(self._cancelled)
+
+
+class AsyncTask(QObject):
+    """在共享事件循环中执行协程，完成后通过信号把结果发回 UI 线程
+
+    与 SimpleThread 用法相同，但不占用额外的线程，网络请求复用共享连接池。
+    失败时 task_failed 发出异常对象，task_finished 不会发出。
+    """
+
+    task_finished: pyqtSignal = pyqtSignal(object)
+    task_failed: pyqtSignal = pyqtSignal(object)
+
+    def __init__(self, call: Callable[[], Coroutine[Any, Any, object]], parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.call = call
+        self._future: Future | None = None
+
+    def start(self) -> None:
+        self._future = submit(self.call())
+        # 回调在事件循环线程中执行，跨线程发出的信号由 Qt 排队到接收者所在线程
+        self._future.add_done_callback(self._on_done)
+
+    def cancel(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+
+    def is_running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            return
+        if (exc := future.exception()) is not None:
+            logger.opt(exception=exc).warning("后台异步任务出错")
+            self.task_failed.emit(exc)
+        else:
+            self.task_finished.emit(future.result())
@@ -0,0 +1,56 @@
+"""持久化 TTL 缓存：过期判断、批量读写与多线程共用连接"""
+
+import threading
+import time
+import types
+
+import pytest
+
+from src.utils import cache as cache_mod
+from src.utils.cache import PersistentTTLCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentTTLCache("test", ttl=60, path=tmp_path / "cache.db")
+    yield cache
+    cache.close()
+
+
+def test_expired_entries_are_kept_but_not_returned(cache, monkeypatch) -> None:
+    cache.set("bv", {"title": "歌回"})
+    assert cache.get("bv") == {"title": "歌回"}
+
+    # 写入后过去了 120 秒
+    later = time.time() + 120
+    monkeypatch.setattr(cache_mod, "time", types.SimpleNamespace(time=lambda: later))
+    assert cache.get("bv") is None
+    assert cache.get_many(["bv"]) == {}
+    assert cache.get("bv", max_age=300) == {"title": "歌回"}
+    value, age = cache.get_entry("bv")
+    assert value == {"title": "歌回"}
+    assert age >= 120
+
+
+def test_namespaces_are_isolated(cache, tmp_path) -> None:
+    other = PersistentTTLCache("other", ttl=60, path=tmp_path / "cache.db")
+    try:
+        cache.set_many({"a": 1, "b": 2})
+        other.set("a", "x")
+        cache.delete("b")
+        assert cache.get_many(["a", "b", "c"]) == {"a": 1}
+        other.clear()
+        assert other.get("a") is None
+        assert cache.get("a") == 1
+    finally:
+        other.close()
+
+
+def test_threads_share_one_connection(cache) -> None:
+    threads = [threading.Thread(target=cache.set, args=(str(i), i)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.get_many(str(i) for i in range(32)) == {str(i): i for i in range(32)}
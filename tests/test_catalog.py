@@ -0,0 +1,154 @@
+"""SQLite 视频目录：旧版数据迁移、标题全文检索、来源与水位线"""
+
+import json
+import sqlite3
+
+import pytest
+
+from src.core import catalog as catalog_mod
+from src.core.catalog import SCHEMA_VERSION, SEARCH_SOURCE, VideoCatalog, user_source
+from src.utils.text import parse_timestamp
+
+# 第一版数据库结构：date 为日期字符串，只有归一化标题的全文索引
+_V0_SCHEMA = """
+CREATE TABLE videos (
+    bv TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    title_norm TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE TABLE imported_files (name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL);
+CREATE VIRTUAL TABLE videos_fts USING fts5(title_norm, content='videos', content_rowid='rowid', tokenize='trigram');
+CREATE TRIGGER videos_ai AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_fts(rowid, title_norm) VALUES (new.rowid, new.title_norm);
+END;
+"""
+
+
+def _record(bv: str, title: str, author: str = "Neuro", date: object = "2024-01-01 00:00:00") -> dict:
+    return {"title": title, "author": author, "date": date, "url": f"https://www.bilibili.com/video/{bv}/", "bv": bv}
+
+
+@pytest.fixture
+def video_dir(tmp_path, monkeypatch):
+    # 首次打开旧版数据库时会导入 VIDEO_DIR 下的 *data.json
+    monkeypatch.setattr(catalog_mod, "VIDEO_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def catalog(video_dir):
+    catalog = VideoCatalog(video_dir / "catalog.db")
+    yield catalog
+    catalog.close()
+
+
+def test_migrates_legacy_database_and_imports_json(video_dir) -> None:
+    db = video_dir / "catalog.db"
+    conn = sqlite3.connect(db)
+    conn.executescript(_V0_SCHEMA)
+    conn.execute(
+        "INSERT INTO videos (bv, title, author, date, url, title_norm, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("BV1old", "Neuro 歌回 合集", "Neuro", "2023-05-06 07:08:09", "", "neuro歌回合集", user_source(1)),
+    )
+    conn.commit()
+    conn.close()
+    legacy = video_dir / "2_data.json"
+    legacy.write_text(json.dumps({"data": [_record("BV1json", "Evil 合唱 现场")]}), encoding="utf-8")
+
+    catalog = VideoCatalog(db)
+    try:
+        assert catalog.count() == 2
+        assert catalog.count(legacy.name) == 1
+        (old,) = catalog.search_titles(["歌回"]).get_data()
+        assert old.bv == "BV1old"
+        assert old.date == parse_timestamp("2023-05-06 07:08:09")
+        # 迁移前已有的记录也补建了原标题全文索引
+        assert [r.bv for r in catalog.search_titles(["neuro", "合集"])] == ["BV1old"]
+        assert [r.bv for r in catalog.search_titles(["合唱现场"])] == []
+        # 重建 videos 表时保留了 rowid，归一化标题索引依旧指向正确的记录
+        assert [bv for bv, _ in catalog.match_title_candidates("neuro歌回合集")] == ["BV1old"]
+    finally:
+        catalog.close()
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT typeof(date) FROM videos").fetchall() == [("integer",), ("integer",)]
+
+    # 已导入且未改动的文件不会再次导入，结构已是最新时也不会自动导入
+    reopened = VideoCatalog(db)
+    try:
+        assert reopened.import_json_dir(video_dir) == 0
+        assert reopened.count() == 2
+    finally:
+        reopened.close()
+
+
+def test_search_titles_requires_every_token(catalog) -> None:
+    catalog.upsert(
+        [
+            _record("BV1", "Neuro-sama 歌回 2024"),
+            _record("BV2", "neuro 合唱 歌回"),
+            _record("BV3", "Evil Neuro 杂谈"),
+            _record("BV4", "SONG compilation"),
+        ],
+        user_source(1),
+    )
+
+    # 三字及以上的分词经 FTS 预筛选，短分词逐行匹配，都不区分大小写并保持写入顺序
+    assert [r.bv for r in catalog.search_titles(["neuro"])] == ["BV1", "BV2", "BV3"]
+    assert [r.bv for r in catalog.search_titles(["NEURO", "歌回"])] == ["BV1", "BV2"]
+    assert [r.bv for r in catalog.search_titles(["song"])] == ["BV4"]
+    assert [r.bv for r in catalog.search_titles(["杂谈", "evil"])] == ["BV3"]
+    assert [r.bv for r in catalog.search_titles(["合唱", "杂谈"])] == []
+    assert len(catalog.search_titles([])) == 4
+
+    assert catalog.title_doc_freq("neuro") == 3
+    assert catalog.title_doc_freq("歌回") == 2
+
+
+def test_search_titles_follows_title_updates(catalog) -> None:
+    catalog.upsert([_record("BV1", "旧标题 karaoke")], user_source(1))
+    catalog.upsert([_record("BV1", "新标题 concert")], user_source(1))
+
+    assert [r.bv for r in catalog.search_titles(["concert"])] == ["BV1"]
+    assert len(catalog.search_titles(["karaoke"])) == 0
+
+
+def test_search_hits_do_not_override_a_specific_source(catalog) -> None:
+    catalog.upsert([_record("BV1", "歌回")], SEARCH_SOURCE)
+    catalog.upsert([_record("BV1", "歌回")], user_source(1))
+    assert catalog.count(SEARCH_SOURCE) == 0
+    assert catalog.count(user_source(1)) == 1
+
+    catalog.upsert([_record("BV1", "歌回 (更新)")], SEARCH_SOURCE)
+    assert catalog.count(user_source(1)) == 1
+    assert catalog.search_titles(["更新"]).get_data()[0].bv == "BV1"
+
+
+def test_watermark_round_trip(catalog) -> None:
+    assert catalog.get_watermark(1) is None
+    catalog.set_watermark(1, "BV1", 100)
+    catalog.set_watermark(1, "BV2", 200)
+    assert catalog.get_watermark(1) == ("BV2", 200)
+    assert catalog.get_watermark(2) is None
+
+
+def test_export_can_be_imported_again(catalog, tmp_path) -> None:
+    catalog.upsert([_record("BV1", "歌回", date="2024-02-03 04:05:06"), _record("BV2", "合唱")], user_source(1))
+    catalog.upsert([_record("BV3", "其它")], SEARCH_SOURCE)
+    shared = tmp_path / "shared"
+    shared.mkdir()
+
+    assert catalog.export_json(shared / "friend_data.json", user_source(1)) == 2
+
+    other = VideoCatalog(tmp_path / "other.db")
+    try:
+        assert other.import_json_dir(shared) == 2
+        assert [r.to_dict() for r in other.load_all()] == [r.to_dict() for r in catalog.load_all(user_source(1))]
+    finally:
+        other.close()
@@ -0,0 +1,218 @@
+"""可续传下载：在本地回放服务器上验证分段、重新分配、中断续传与进度恢复"""
+
+import asyncio
+import json
+import random
+from itertools import pairwise
+
+import pytest
+from aiohttp import web
+
+from src.bili_api import downloader
+from src.bili_api.common import set_redirect_base
+from src.bili_api.fixture_server import Fixture, FixtureServer
+from src.utils.runtime import run_sync
+
+MEDIA_HOST = "upos-sz-mirror08c.bilivideo.com"
+MEDIA_PATH = "/upgcxcode/00/00/1/1-1-30280.m4s"
+URL = f"https://{MEDIA_HOST}{MEDIA_PATH}?deadline=1&upsig=test"
+SIZE = 2 * 1024 * 1024 + 12345
+SEGMENT_MIN_SIZE = 64 * 1024
+DROP_AFTER = 256 * 1024
+
+
+class RecordingServer(FixtureServer):
+    """记录每个媒体请求的 Range，并可让从指定位置开始的请求延迟响应（模拟慢连接）"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.ranges: list[str | None] = []
+        self.slow_start: int | None = None
+        self.slow_delay = 0.0
+
+    async def _send_media(self, request: web.Request, fixture: Fixture) -> web.StreamResponse:
+        range_header = request.headers.get("Range")
+        self.ranges.append(range_header)
+        if (
+            self.slow_start is not None
+            and range_header != "bytes=0-0"
+            and (range_header or "").startswith(f"bytes={self.slow_start}-")
+        ):
+            await asyncio.sleep(self.slow_delay)
+        return await super()._send_media(request, fixture)
+
+    def spans(self) -> list[tuple[int, int]]:
+        """按请求顺序返回分段请求的 [start, end)，不含探测长度的 bytes=0-0"""
+        result = []
+        for value in self.ranges:
+            if value is None or value == "bytes=0-0":
+                continue
+            first, _, last = value.removeprefix("bytes=").partition("-")
+            result.append((int(first), int(last) + 1 if last else SIZE))
+        return result
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "DOWNLOAD_DIR", tmp_path / "downloads")
+    monkeypatch.setattr(downloader, "SEGMENT_MIN_SIZE", SEGMENT_MIN_SIZE)
+    monkeypatch.setattr(downloader, "STATE_SAVE_INTERVAL", 0.0)
+    monkeypatch.setattr(downloader, "RESUME_BACKOFF_CAP", 0.01)
+
+    body = random.Random(0).randbytes(SIZE)
+    server = RecordingServer(tmp_path / "fixtures")
+    server.store.save("GET", MEDIA_HOST, MEDIA_PATH, "", Fixture(200, "video/mp4", body))
+    run_sync(server.start())
+    set_redirect_base(server.base_url)
+    yield server, body
+    set_redirect_base(None)
+    run_sync(server.close())
+
+
+def _download(connections: int = 4) -> bytes:
+    path = run_sync(downloader.fetch_resumable(URL, ".m4s", {}, connections=connections))
+    data = path.read_bytes()
+    path.unlink()
+    return data
+
+
+def _part_path():
+    target = downloader.content_path(URL, ".m4s")
+    return target.with_name(target.name + downloader.PART_SUFFIX)
+
+
+def _initial_segments(connections: int = 4) -> list[tuple[int, int]]:
+    """从头下载时最初拆出的各段"""
+    download = downloader.SegmentedDownload(URL, _part_path(), {}, SIZE, connections, "")
+    download.pending = [downloader.Segment(0, SIZE)]
+    download._plan()
+    return sorted((seg.pos, seg.end) for seg in download.pending)
+
+
+def _covered(spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """合并区间"""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def test_splits_into_contiguous_segments(media) -> None:
+    server, body = media
+
+    assert _download() == body
+    assert server.ranges[0] == "bytes=0-0"
+    # 初始拆成 4 段，首尾相接，恰好覆盖整个文件，每段各用一个请求
+    initial = _initial_segments()
+    assert len(initial) == 4
+    assert initial[0][0] == 0
+    assert initial[-1][1] == SIZE
+    assert all(a[1] == b[0] for a, b in pairwise(initial))
+    assert set(initial) <= set(server.spans())
+    assert list(downloader.DOWNLOAD_DIR.glob("*.part*")) == []
+
+
+def test_dropped_segments_are_requeued_from_their_position(media, monkeypatch) -> None:
+    server, body = media
+    monkeypatch.setattr(downloader, "MAX_RESUMES", 50)
+    server.faults.drop_after = DROP_AFTER
+
+    assert _download() == body
+    spans = server.spans()
+    starts = {start for start, _ in spans}
+    assert server.stats.dropped >= 4
+    # 每个初始段在断开处重新排队，之后从已写入的位置继续请求，而不是从头开始
+    for start, end in _initial_segments():
+        assert end - start > DROP_AFTER
+        assert start + DROP_AFTER in starts
+    assert _covered(spans) == [(0, SIZE)]
+
+
+def test_slow_segment_is_reassigned(media) -> None:
+    server, body = media
+    server.slow_start = 0
+    server.slow_delay = 1.0
+
+    assert _download() == body
+    first_end = _initial_segments()[0][1]
+    # 其它连接完成后拆走了慢连接负责的第一段的后半部分
+    assert any(0 < start < first_end for start, _ in server.spans())
+
+
+def test_resumes_from_progress_file(media, monkeypatch) -> None:
+    server, body = media
+    monkeypatch.setattr(downloader, "MAX_RESUMES", 0)
+    server.faults.drop_after = DROP_AFTER
+
+    # 多条连接可能同时断开，此时抛出的是 ExceptionGroup
+    with pytest.raises(Exception):  # noqa: B017
+        _download()
+    state_path = _part_path().with_name(_part_path().name + downloader.STATE_SUFFIX)
+    pending = json.loads(state_path.read_text("utf-8"))["pending"]
+    assert 0 < sum(end - start for start, end in pending) < SIZE
+
+    monkeypatch.setattr(downloader, "MAX_RESUMES", 5)
+    server.faults.drop_after = 0
+    server.ranges.clear()
+    assert _download() == body
+    # 续传只请求进度文件中记录的未完成范围
+    for start, end in server.spans():
+        assert any(p_start <= start and end <= p_end for p_start, p_end in pending)
+    assert not state_path.exists()
+
+
+def test_full_length_part_without_progress_is_redownloaded(media) -> None:
+    server, body = media
+    part = _part_path()
+    part.parent.mkdir(parents=True, exist_ok=True)
+    part.write_bytes(bytes(SIZE))
+
+    assert _download() == body
+    assert _covered(server.spans()) == [(0, SIZE)]
+
+
+def test_sequential_prefix_is_kept(media) -> None:
+    server, body = media
+    part = _part_path()
+    part.parent.mkdir(parents=True, exist_ok=True)
+    part.write_bytes(body[:300_000])
+
+    assert _download() == body
+    assert _covered(server.spans()) == [(300_000, SIZE)]
+
+
+def test_progress_is_written_before_preallocation(media) -> None:
+    part = _part_path()
+    part.parent.mkdir(parents=True, exist_ok=True)
+    download = downloader.SegmentedDownload(URL, part, {}, SIZE, 4, "")
+
+    download._restore()
+
+    state = json.loads(download.state_path.read_text("utf-8"))
+    assert state == {"total": SIZE, "pending": [[0, SIZE]]}
+    assert part.stat().st_size == SIZE
+
+
+def test_concurrent_downloads_of_one_stream_take_turns(media) -> None:
+    _, body = media
+    events: list[str] = []
+
+    async def use(name: str) -> bytes:
+        async with downloader.resumable_download(URL, ".m4s", {}, connections=4) as path:
+            events.append(f"{name} 开始")
+            data = await asyncio.to_thread(path.read_bytes)
+            await asyncio.sleep(0.05)
+            events.append(f"{name} 结束")
+        return data
+
+    async def main() -> list[bytes]:
+        return await asyncio.gather(use("a"), use("b"))
+
+    assert run_sync(main()) == [body, body]
+    # 后一个下载在前一个用完并删除文件之后才开始，两者不会同时写入同一个 .part
+    assert events in (["a 开始", "a 结束", "b 开始", "b 结束"], ["b 开始", "b 结束", "a 开始", "a 结束"])
+    assert downloader._file_locks == {}
+    assert list(downloader.DOWNLOAD_DIR.glob("*")) == []
@@ -0,0 +1,41 @@
+"""模糊搜索索引：拼音、错别字与标题更新"""
+
+from src.core.fuzzy_index import FuzzyIndex
+from src.core.song_list import SongList, SongRecord
+
+
+def _index(*titles: str) -> FuzzyIndex:
+    index = FuzzyIndex()
+    index.add_list(SongRecord(title=title, bv=f"BV{i}") for i, title in enumerate(titles, 1))
+    return index
+
+
+def test_pinyin_and_typos_hit_the_right_title() -> None:
+    index = _index("Neuro 歌回 2024", "Evil 杂谈", "Never Gonna Give You Up")
+
+    assert index.search("gehui")[0][0] == "BV1"
+    assert index.search("nevr gona")[0][0] == "BV3"
+    assert index.search("歌回")[0] == ("BV1", 1.0)
+    assert index.search("completely unrelated") == []
+    assert index.search("!!!") == []
+
+
+def test_updated_titles_replace_their_grams() -> None:
+    index = _index("karaoke night")
+    assert index.add(SongRecord(title="karaoke night", bv="BV1")) is False
+    assert index.add(SongRecord(title="concert", bv="BV1")) is True
+
+    assert index.search("karaoke") == []
+    assert index.search("concert") == [("BV1", 1.0)]
+    assert len(index) == 1
+
+
+def test_sync_skips_an_unchanged_list() -> None:
+    slist = SongList()
+    slist.extend([SongRecord(title="歌回", bv="BV1"), SongRecord(title="合唱", bv="BV2")])
+    view = slist.readonly_view()
+    index = FuzzyIndex()
+
+    assert index.sync(view) == 2
+    assert index.sync(view) == 0
+    assert index.search("hechang")[0][0] == "BV2"
@@ -0,0 +1,35 @@
+"""多模式匹配：与逐词 `word in text` 的结果保持一致"""
+
+import random
+
+from src.utils.matcher import MultiPatternMatcher, get_matcher
+
+
+def test_matches_like_substring_checks() -> None:
+    rng = random.Random(7)
+    alphabet = "ab歌回"
+    for _ in range(200):
+        patterns = ["".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 20)))
+        matcher = MultiPatternMatcher(patterns, ignore_case=False)
+        assert matcher.search(text) == any(p in text for p in patterns)
+        assert matcher.find_all(text) == {p for p in patterns if p in text}
+
+
+def test_overlapping_and_nested_patterns() -> None:
+    matcher = MultiPatternMatcher(["he", "she", "his", "hers"])
+    assert matcher.find_all("ushers") == {"she", "he", "hers"}
+    assert not matcher.search("hi")
+
+
+def test_ignore_case_and_empty_pattern() -> None:
+    assert MultiPatternMatcher(["Neuro"]).search("NEURO 歌回")
+    assert not MultiPatternMatcher(["Neuro"], ignore_case=False).search("NEURO 歌回")
+    assert MultiPatternMatcher([""]).search("")
+    assert not MultiPatternMatcher([])
+    assert not MultiPatternMatcher([]).search("歌回")
+
+
+def test_get_matcher_reuses_compiled_automaton() -> None:
+    assert get_matcher(["合唱", "歌回"]) is get_matcher(["合唱", "歌回"])
+    assert get_matcher(["合唱", "歌回"]) is not get_matcher(["合唱"])
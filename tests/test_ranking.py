@@ -0,0 +1,62 @@
+"""搜索结果排序：BM25 词项统计取自视频目录，并随目录变化刷新"""
+
+import time
+
+import pytest
+
+from src.core import catalog as catalog_mod
+from src.core.catalog import VideoCatalog, user_source
+from src.core.ranking import RankingEngine
+from src.core.song_list import SongList
+
+
+def _record(bv: str, title: str, days_ago: float = 30) -> dict:
+    return {"title": title, "author": "Neuro", "date": int(time.time() - days_ago * 86400), "url": "", "bv": bv}
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_mod, "VIDEO_DIR", tmp_path)
+    catalog = VideoCatalog(tmp_path / "catalog.db")
+    yield catalog
+    catalog.close()
+
+
+def _rank(engine: RankingEngine, catalog: VideoCatalog, query: str, k: int | None = None) -> list[str]:
+    result = SongList()
+    result.extend(catalog.load_all())
+    return [record.bv for record in engine.top_k(result, query, k)]
+
+
+def test_rarer_terms_and_phrases_rank_higher(catalog) -> None:
+    catalog.upsert(
+        [
+            _record("BV1", "歌回 合集"),
+            _record("BV2", "歌回 Never Gonna 现场"),
+            _record("BV3", "歌回 杂谈"),
+            _record("BV4", "Never Gonna Give You Up 歌回"),
+        ],
+        user_source(1),
+    )
+    engine = RankingEngine(catalog)
+
+    # 每条都含「歌回」，idf 很低；完整短语与标题开头命中的记录排在最前
+    assert _rank(engine, catalog, "never gonna", k=2) == ["BV4", "BV2"]
+    assert _rank(engine, catalog, "合集")[0] == "BV1"
+
+
+def test_empty_query_orders_by_recency(catalog) -> None:
+    catalog.upsert([_record("BV1", "a", 10), _record("BV2", "b", 1), _record("BV3", "c", 5)], user_source(1))
+    assert _rank(RankingEngine(catalog), catalog, "") == ["BV2", "BV3", "BV1"]
+
+
+def test_term_statistics_follow_catalog_writes(catalog) -> None:
+    catalog.upsert([_record("BV1", "karaoke night"), _record("BV2", "concert")], user_source(1))
+    engine = RankingEngine(catalog)
+    idf_before, _ = engine._term_stats(["karaoke"])
+
+    catalog.upsert([_record(f"BV{i}", "karaoke") for i in range(3, 10)], user_source(1))
+    idf_after, avgdl = engine._term_stats(["karaoke"])
+
+    assert idf_after["karaoke"] < idf_before["karaoke"]
+    assert avgdl == catalog.avg_title_length()
@@ -0,0 +1,82 @@
+"""请求调度器：在本地回放服务器上验证令牌桶限速与风控退避"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import aiohttp
+
+from src.bili_api.fixture_server import FaultProfile, Fixture, FixtureServer
+from src.bili_api.scheduler import EndpointPolicy, RequestScheduler
+
+API_HOST = "api.bilibili.com"
+VIEW_PATH = "/x/web-interface/view"
+
+
+def _server(root: Path, count: int, faults: FaultProfile | None = None) -> FixtureServer:
+    """为 BV0 ~ BV{count-1} 各录制一条视频信息响应"""
+    server = FixtureServer(root, faults=faults)
+    for i in range(count):
+        body = json.dumps({"code": 0, "message": "0", "data": {"bvid": f"BV{i}", "title": f"video {i}"}})
+        server.store.save("GET", API_HOST, VIEW_PATH, f"bvid=BV{i}", Fixture(200, "application/json", body.encode()))
+    return server
+
+
+async def _view(session: aiohttp.ClientSession, server: FixtureServer, bv: str) -> dict:
+    # 412 以 ClientResponseError 抛出，由调度器识别为风控
+    async with session.get(f"{server.base_url}/{API_HOST}{VIEW_PATH}", params={"bvid": bv}) as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+async def _fetch_all(scheduler: RequestScheduler, server: FixtureServer, count: int) -> list:
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(
+            *(scheduler.call("view", lambda bv=f"BV{i}": _view(session, server, bv)) for i in range(count)),
+            return_exceptions=True,
+        )
+
+
+def test_token_bucket_limits_rate(tmp_path) -> None:
+    server = _server(tmp_path, 24)
+
+    async def main() -> tuple[list, float]:
+        scheduler = RequestScheduler(policies={"view": EndpointPolicy(rate=20.0, burst=4)})
+        async with server:
+            start = time.monotonic()
+            results = await _fetch_all(scheduler, server, 24)
+            return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(main())
+
+    assert all(isinstance(r, dict) for r in results)
+    assert server.stats.served == 24
+    # 突发 4 个之后按每秒 20 个放行，剩余 20 个至少需要 1 秒
+    assert elapsed >= 0.9
+
+
+def test_risk_control_backs_off_and_retries(tmp_path) -> None:
+    server = _server(tmp_path, 15, FaultProfile(rate_limit=5, window=0.5))
+
+    async def main() -> tuple[list, RequestScheduler]:
+        scheduler = RequestScheduler(
+            policies={"view": EndpointPolicy(rate=50.0, burst=20)},
+            max_retries=30,
+            backoff_base=0.05,
+            backoff_cap=0.5,
+        )
+        async with server:
+            return await _fetch_all(scheduler, server, 15), scheduler
+
+    results, scheduler = asyncio.run(main())
+    stats = scheduler.stats()["view"]
+
+    assert all(isinstance(r, dict) for r in results)
+    assert server.stats.served == 15
+    # 每个被风控拒绝的请求都经过了退避重试，并触发了全局降速
+    assert server.stats.throttled > 0
+    assert stats.risk_hits == server.stats.throttled
+    assert stats.retries == server.stats.throttled
+    assert stats.failures == 0
+    assert scheduler.slowdown > 1